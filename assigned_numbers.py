@@ -0,0 +1,408 @@
+import zlib
+from array import array
+from typing import NamedTuple
+
+from ble_uuid import BLUETOOTH_BASE_UUID, uuid_key
+
+# Bluetooth SIG assigned numbers: 16-bit UUIDs of standard services,
+# characteristics and descriptors, and company identifiers.
+#
+# Each table is an array of 65536 name indexes (128 KB), filled once at import
+# from the listings below, so a lookup is one uuid_key() (cached) and one array
+# read. The attribute type follows from the UUID range (0x18xx services, 0x29xx
+# descriptors, 0x2Axx-0x2Bxx characteristics). Nothing here changes at run
+# time; ASSIGNED_NUMBERS_VERSION changes whenever the listings do.
+SERVICES = """
+1800 Generic Access
+1801 Generic Attribute
+1802 Immediate Alert
+1803 Link Loss
+1804 Tx Power
+1805 Current Time
+1806 Reference Time Update
+1807 Next DST Change
+1808 Glucose
+1809 Health Thermometer
+180A Device Information
+180D Heart Rate
+180E Phone Alert Status
+180F Battery
+1810 Blood Pressure
+1811 Alert Notification
+1812 Human Interface Device
+1813 Scan Parameters
+1814 Running Speed and Cadence
+1815 Automation IO
+1816 Cycling Speed and Cadence
+1818 Cycling Power
+1819 Location and Navigation
+181A Environmental Sensing
+181B Body Composition
+181C User Data
+181D Weight Scale
+181E Bond Management
+181F Continuous Glucose Monitoring
+1820 Internet Protocol Support
+1821 Indoor Positioning
+1822 Pulse Oximeter
+1823 HTTP Proxy
+1824 Transport Discovery
+1825 Object Transfer
+1826 Fitness Machine
+1827 Mesh Provisioning
+1828 Mesh Proxy
+1829 Reconnection Configuration
+183A Insulin Delivery
+183B Binary Sensor
+183C Emergency Configuration
+183D Authorization Control
+183E Physical Activity Monitor
+183F Elapsed Time
+1840 Generic Health Sensor
+1843 Audio Input Control
+1844 Volume Control
+1845 Volume Offset Control
+1846 Coordinated Set Identification
+1847 Device Time
+1848 Media Control
+1849 Generic Media Control
+184A Constant Tone Extension
+184B Telephone Bearer
+184C Generic Telephone Bearer
+184D Microphone Control
+184E Audio Stream Control
+184F Broadcast Audio Scan
+1850 Published Audio Capabilities
+1851 Basic Audio Announcement
+1852 Broadcast Audio Announcement
+1853 Common Audio
+1854 Hearing Access
+1855 Telephony and Media Audio
+1856 Public Broadcast Announcement
+1857 Electronic Shelf Label
+1858 Gaming Audio
+1859 Mesh Proxy Solicitation
+"""
+
+DESCRIPTORS = """
+2900 Characteristic Extended Properties
+2901 Characteristic User Description
+2902 Client Characteristic Configuration
+2903 Server Characteristic Configuration
+2904 Characteristic Presentation Format
+2905 Characteristic Aggregate Format
+2906 Valid Range
+2907 External Report Reference
+2908 Report Reference
+2909 Number of Digitals
+290A Value Trigger Setting
+290B Environmental Sensing Configuration
+290C Environmental Sensing Measurement
+290D Environmental Sensing Trigger Setting
+290E Time Trigger Setting
+290F Complete BR-EDR Transport Block Data
+2910 Observation Schedule
+2911 Valid Range and Accuracy
+"""
+
+CHARACTERISTICS = """
+2A00 Device Name
+2A01 Appearance
+2A02 Peripheral Privacy Flag
+2A03 Reconnection Address
+2A04 Peripheral Preferred Connection Parameters
+2A05 Service Changed
+2A06 Alert Level
+2A07 Tx Power Level
+2A08 Date Time
+2A09 Day of Week
+2A0A Day Date Time
+2A0C Exact Time 256
+2A0D DST Offset
+2A0E Time Zone
+2A0F Local Time Information
+2A11 Time with DST
+2A12 Time Accuracy
+2A13 Time Source
+2A14 Reference Time Information
+2A16 Time Update Control Point
+2A17 Time Update State
+2A18 Glucose Measurement
+2A19 Battery Level
+2A1C Temperature Measurement
+2A1D Temperature Type
+2A1E Intermediate Temperature
+2A21 Measurement Interval
+2A22 Boot Keyboard Input Report
+2A23 System ID
+2A24 Model Number String
+2A25 Serial Number String
+2A26 Firmware Revision String
+2A27 Hardware Revision String
+2A28 Software Revision String
+2A29 Manufacturer Name String
+2A2A IEEE 11073-20601 Regulatory Certification Data List
+2A2B Current Time
+2A31 Scan Refresh
+2A32 Boot Keyboard Output Report
+2A33 Boot Mouse Input Report
+2A34 Glucose Measurement Context
+2A35 Blood Pressure Measurement
+2A36 Intermediate Cuff Pressure
+2A37 Heart Rate Measurement
+2A38 Body Sensor Location
+2A39 Heart Rate Control Point
+2A3F Alert Status
+2A40 Ringer Control Point
+2A41 Ringer Setting
+2A42 Alert Category ID Bit Mask
+2A43 Alert Category ID
+2A44 Alert Notification Control Point
+2A45 Unread Alert Status
+2A46 New Alert
+2A47 Supported New Alert Category
+2A48 Supported Unread Alert Category
+2A49 Blood Pressure Feature
+2A4A HID Information
+2A4B Report Map
+2A4C HID Control Point
+2A4D Report
+2A4E Protocol Mode
+2A4F Scan Interval Window
+2A50 PnP ID
+2A51 Glucose Feature
+2A52 Record Access Control Point
+2A53 RSC Measurement
+2A54 RSC Feature
+2A55 SC Control Point
+2A5A Aggregate
+2A5B CSC Measurement
+2A5C CSC Feature
+2A5D Sensor Location
+2A5E PLX Spot-Check Measurement
+2A5F PLX Continuous Measurement
+2A60 PLX Features
+2A63 Cycling Power Measurement
+2A64 Cycling Power Vector
+2A65 Cycling Power Feature
+2A66 Cycling Power Control Point
+2A67 Location and Speed
+2A68 Navigation
+2A69 Position Quality
+2A6A LN Feature
+2A6B LN Control Point
+2A6C Elevation
+2A6D Pressure
+2A6E Temperature
+2A6F Humidity
+2A70 True Wind Speed
+2A71 True Wind Direction
+2A72 Apparent Wind Speed
+2A73 Apparent Wind Direction
+2A74 Gust Factor
+2A75 Pollen Concentration
+2A76 UV Index
+2A77 Irradiance
+2A78 Rainfall
+2A79 Wind Chill
+2A7A Heat Index
+2A7B Dew Point
+2A7D Descriptor Value Changed
+2A7E Aerobic Heart Rate Lower Limit
+2A7F Aerobic Threshold
+2A80 Age
+2A81 Anaerobic Heart Rate Lower Limit
+2A82 Anaerobic Heart Rate Upper Limit
+2A83 Anaerobic Threshold
+2A84 Aerobic Heart Rate Upper Limit
+2A85 Date of Birth
+2A86 Date of Threshold Assessment
+2A87 Email Address
+2A88 Fat Burn Heart Rate Lower Limit
+2A89 Fat Burn Heart Rate Upper Limit
+2A8A First Name
+2A8B Five Zone Heart Rate Limits
+2A8C Gender
+2A8D Heart Rate Max
+2A8E Height
+2A8F Hip Circumference
+2A90 Last Name
+2A91 Maximum Recommended Heart Rate
+2A92 Resting Heart Rate
+2A93 Sport Type for Aerobic and Anaerobic Thresholds
+2A94 Three Zone Heart Rate Limits
+2A95 Two Zone Heart Rate Limits
+2A96 VO2 Max
+2A97 Waist Circumference
+2A98 Weight
+2A99 Database Change Increment
+2A9A User Index
+2A9B Body Composition Feature
+2A9C Body Composition Measurement
+2A9D Weight Measurement
+2A9E Weight Scale Feature
+2A9F User Control Point
+2AA0 Magnetic Flux Density - 2D
+2AA1 Magnetic Flux Density - 3D
+2AA2 Language
+2AA3 Barometric Pressure Trend
+2AA4 Bond Management Control Point
+2AA5 Bond Management Feature
+2AA6 Central Address Resolution
+2AA7 CGM Measurement
+2AA8 CGM Feature
+2AA9 CGM Status
+2AAA CGM Session Start Time
+2AAB CGM Session Run Time
+2AAC CGM Specific Ops Control Point
+2AAD Indoor Positioning Configuration
+2AAE Latitude
+2AAF Longitude
+2AB0 Local North Coordinate
+2AB1 Local East Coordinate
+2AB2 Floor Number
+2AB3 Altitude
+2AB4 Uncertainty
+2AB5 Location Name
+2AB6 URI
+2AB7 HTTP Headers
+2AB8 HTTP Status Code
+2AB9 HTTP Entity Body
+2ABA HTTP Control Point
+2ABB HTTPS Security
+2ABC TDS Control Point
+2ABD OTS Feature
+2ABE Object Name
+2ABF Object Type
+2AC0 Object Size
+2AC1 Object First-Created
+2AC2 Object Last-Modified
+2AC3 Object ID
+2AC4 Object Properties
+2AC5 Object Action Control Point
+2AC6 Object List Control Point
+2AC7 Object List Filter
+2AC8 Object Changed
+2AC9 Resolvable Private Address Only
+2ACC Fitness Machine Feature
+2ACD Treadmill Data
+2ACE Cross Trainer Data
+2ACF Step Climber Data
+2AD0 Stair Climber Data
+2AD1 Rower Data
+2AD2 Indoor Bike Data
+2AD3 Training Status
+2AD4 Supported Speed Range
+2AD5 Supported Inclination Range
+2AD6 Supported Resistance Level Range
+2AD7 Supported Heart Rate Range
+2AD8 Supported Power Range
+2AD9 Fitness Machine Control Point
+2ADA Fitness Machine Status
+2ADB Mesh Provisioning Data In
+2ADC Mesh Provisioning Data Out
+2ADD Mesh Proxy Data In
+2ADE Mesh Proxy Data Out
+2B29 Client Supported Features
+2B2A Database Hash
+2B3A Server Supported Features
+"""
+
+COMPANIES = """
+0000 Ericsson AB
+0001 Nokia Mobile Phones
+0002 Intel Corp.
+0003 IBM Corp.
+0004 Toshiba Corp.
+0005 3Com
+0006 Microsoft
+0007 Lucent
+0008 Motorola
+000A Qualcomm Technologies International, Ltd. (QTIL)
+000D Texas Instruments Inc.
+000F Broadcom Corporation
+001D Qualcomm
+0030 ST Microelectronics
+0046 MediaTek, Inc.
+004C Apple, Inc.
+0057 Harman International Industries, Inc.
+0059 Nordic Semiconductor ASA
+0067 GN Audio A/S
+006B Polar Electro OY
+0075 Samsung Electronics Co. Ltd.
+0078 Nike, Inc.
+0087 Garmin International, Inc.
+009E Bose Corporation
+00C4 LG Electronics
+00D2 Dialog Semiconductor B.V.
+00E0 Google
+0131 Cypress Semiconductor
+0157 Anhui Huami Information Technology Co., Ltd.
+0171 Amazon.com Services LLC
+02E5 Espressif Systems (Shanghai) Co., Ltd.
+038F Xiaomi Inc.
+0499 Ruuvi Innovations Ltd.
+"""
+
+ASSIGNED_NUMBERS_VERSION = f"{zlib.crc32((SERVICES + DESCRIPTORS + CHARACTERISTICS + COMPANIES).encode()):08x}"
+BASE_TAIL = BLUETOOTH_BASE_UUID.bytes[4:]
+
+
+class AssignedNumber(NamedTuple):
+    uuid: str
+    name: str
+    attribute_type: str
+
+
+def attribute_type(number: int) -> str:
+    if 0x1800 <= number <= 0x18FF:
+        return "service"
+    if 0x2900 <= number <= 0x29FF:
+        return "descriptor"
+    return "characteristic"
+
+
+_names = [""]
+
+
+def _load(*listings: str) -> array:
+    table = array("H", bytes(2 * 65536))
+    for listing in listings:
+        for line in listing.strip().splitlines():
+            number, name = line.split(" ", 1)
+            table[int(number, 16)] = len(_names)
+            _names.append(name)
+    return table
+
+
+_uuids = _load(SERVICES, DESCRIPTORS, CHARACTERISTICS)
+_companies = _load(COMPANIES)
+NAMES = tuple(_names)
+del _names
+
+
+# 16-bit number of a UUID in any form ("180d", "0x180D", "0000180D-0000-1000-
+# 8000-00805F9B34FB"), or None if it is not based on the Bluetooth base UUID
+def short_uuid(value: str) -> int | None:
+    key = uuid_key(value)
+    if key[4:] != BASE_TAIL or key[:2] != b"\0\0":
+        return None
+    return int.from_bytes(key[2:4], "big")
+
+
+def lookup_assigned(value: str) -> AssignedNumber | None:
+    number = short_uuid(value)
+    if number is None or not _uuids[number]:
+        return None
+    return AssignedNumber(f"{number:04X}", NAMES[_uuids[number]], attribute_type(number))
+
+
+def assigned_name(value: str) -> str | None:
+    number = short_uuid(value)
+    return NAMES[_uuids[number]] or None if number is not None else None
+
+
+def company_name(company_id: int) -> str | None:
+    if not 0 <= company_id <= 0xFFFF:
+        return None
+    return NAMES[_companies[company_id]] or None
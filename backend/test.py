@@ -1,2 +0,0 @@
-# Update the FastAPI app title
-app = FastAPI(title="Open UUID Project") 
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""Repeatable API benchmark suite.
+
+For each dataset size, seeds a fresh SQLite database with
+datasets.generate_attributes() and drives the app in-process (httpx ASGI
+transport) through these scenarios, in order:
+
+  lookup       GET /attributes/{uuid} for UUIDs drawn from the dataset
+  search       GET /attributes/?search= with vendor names, words and UUID prefixes
+  listing      GET /attributes/ pages, following X-Next-Cursor
+  log_parse    POST /parse-log/ with a synthetic nRF Connect log
+  bulk_delete  DELETE /attributes/?vendor= for vendors of decreasing size
+
+Every size runs in its own process. The response cache is off (unless
+--cache), so the database is measured. Results are written as JSON with the
+commit and library versions, by default to benchmarks/results/ (ignored by
+git). --compare prints the change against an earlier results file:
+
+    pip install httpx
+    python benchmarks/api_benchmark.py --rows 10000 100000 1000000 --output before.json
+    python benchmarks/api_benchmark.py --rows 10000 100000 1000000 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datasets import SERVICE_NAMES, generate_attributes, generate_nrf_log  # noqa: E402
+
+SCENARIOS = ["lookup", "search", "listing", "log_parse", "bulk_delete"]
+SEED_BATCH_SIZE = 10000
+SAMPLE_SIZE = 10000
+
+
+def summarize(latencies, **extra) -> dict:
+    latencies = sorted(latencies)
+    total = sum(latencies)
+
+    def percentile(fraction):
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+    return {
+        "requests": len(latencies),
+        "seconds": total,
+        "rps": len(latencies) / total if total else 0.0,
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": latencies[-1] * 1000,
+        **extra,
+    }
+
+
+async def seed(api, args):
+    """Bulk-insert the dataset; returns a sample of UUIDs and vendor row counts."""
+    from sqlalchemy import insert
+
+    rng = random.Random(args.seed)
+    table = api.BLEAttribute.__table__
+    uuids = []
+    vendors = {}
+    batch = []
+    seen = 0
+    async with api.SessionLocal() as db:
+        for record in generate_attributes(args.rows, args.seed, args.vendors, args.skew):
+            batch.append(api.attribute_row(record))
+            vendors[record["vendor"]] = vendors.get(record["vendor"], 0) + 1
+            # Reservoir sample of UUIDs for lookups
+            seen += 1
+            if len(uuids) < SAMPLE_SIZE:
+                uuids.append(record["uuid"])
+            elif rng.randrange(seen) < SAMPLE_SIZE:
+                uuids[rng.randrange(SAMPLE_SIZE)] = record["uuid"]
+            if len(batch) >= SEED_BATCH_SIZE:
+                await db.execute(insert(table), batch)
+                await db.commit()
+                batch = []
+        if batch:
+            await db.execute(insert(table), batch)
+            await db.commit()
+    return uuids, vendors
+
+
+async def timed(client, method, path, latencies, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    latencies.append(time.perf_counter() - start)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path}: {response.status_code} {response.text[:200]}")
+    return response
+
+
+async def run_scenarios(client, args, uuids, vendors) -> dict:
+    rng = random.Random(args.seed)
+    results = {}
+
+    if "lookup" in args.scenarios:
+        latencies = []
+        for _ in range(args.requests):
+            await timed(client, "GET", f"/attributes/{rng.choice(uuids)}", latencies)
+        results["lookup"] = summarize(latencies)
+
+    if "search" in args.scenarios:
+        ranked = sorted(vendors, key=vendors.get, reverse=True)
+        latencies = []
+        for i in range(args.requests):
+            kind = i % 3
+            if kind == 0:
+                term = ranked[min(int(rng.expovariate(0.05)), len(ranked) - 1)]
+            elif kind == 1:
+                term = rng.choice(SERVICE_NAMES).split()[0]
+            else:
+                term = rng.choice(uuids)[:rng.choice((4, 8, 13))]
+            await timed(client, "GET", "/attributes/", latencies, params={"search": term, "limit": 20})
+        results["search"] = summarize(latencies)
+
+    if "listing" in args.scenarios:
+        latencies = []
+        cursor = None
+        for _ in range(args.requests):
+            params = {"limit": 50, "show_all": "true"}
+            if cursor:
+                params["cursor"] = cursor
+            response = await timed(client, "GET", "/attributes/", latencies, params=params)
+            cursor = response.headers.get("X-Next-Cursor")
+        results["listing"] = summarize(latencies, page_size=50)
+
+    if "log_parse" in args.scenarios:
+        latencies = []
+        log_text = "\n".join(generate_nrf_log(args.log_lines, args.seed))
+        for i in range(args.repeat):
+            await timed(client, "POST", "/parse-log/", latencies, json={
+                "log_text": log_text, "vendor": f"Capture {i}", "model": "nRF52", "dialect": "nrf_connect"
+            })
+        results["log_parse"] = summarize(
+            latencies, lines=args.log_lines, lines_per_sec=args.log_lines * len(latencies) / sum(latencies)
+        )
+
+    if "bulk_delete" in args.scenarios:
+        # Largest vendor first, then every tenth rank
+        ranked = sorted(vendors, key=vendors.get, reverse=True)
+        targets = ranked[:args.repeat * 10:10]
+        latencies = []
+        deleted = 0
+        for vendor in targets:
+            response = await timed(client, "DELETE", "/attributes/", latencies, params={"vendor": vendor})
+            deleted += response.json()["deleted"]
+        results["bulk_delete"] = summarize(latencies, rows_deleted=deleted)
+
+    return results
+
+
+async def run_size(args) -> dict:
+    import httpx
+
+    logging.disable(logging.WARNING)
+    tmpdir = tempfile.mkdtemp(prefix="uuid-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["JOB_DIR"] = os.path.join(tmpdir, "jobs")
+    if not args.cache:
+        os.environ["RESPONSE_CACHE_TTL"] = "0"
+    os.environ.setdefault("SLOW_QUERY_SECONDS", "0")
+    sys.path.insert(0, ROOT)
+    import test as api
+
+    await api.init_db()
+    start = time.perf_counter()
+    uuids, vendors = await seed(api, args)
+    seed_seconds = time.perf_counter() - start
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up connections and caches outside the measurements
+        for uuid in uuids[:20]:
+            await client.get(f"/attributes/{uuid}")
+        scenarios = await run_scenarios(client, args, uuids, vendors)
+    await api.close_db()
+    return {"rows": args.rows, "seed_seconds": seed_seconds, "scenarios": scenarios}
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import sqlalchemy
+    return {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "sqlalchemy": sqlalchemy.__version__,
+        "args": {name: value for name, value in vars(args).items() if name not in ("child", "output", "compare")},
+    }
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    for run in (baseline or {}).get("results", []):
+        for name, scenario in run["scenarios"].items():
+            previous[run["rows"], name] = scenario
+    print(f"{'rows':>10} {'scenario':<12} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}" + (f" {'p50 change':>11}" if baseline else ""))
+    for run in results:
+        for name, scenario in run["scenarios"].items():
+            line = (f"{run['rows']:>10} {name:<12} {scenario['rps']:>9.1f} "
+                    f"{scenario['p50_ms']:>9.2f} {scenario['p99_ms']:>9.2f}")
+            before = previous.get((run["rows"], name))
+            if before and before["p50_ms"]:
+                line += f" {(scenario['p50_ms'] / before['p50_ms'] - 1) * 100:>+10.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per read scenario")
+    parser.add_argument("--repeat", type=int, default=5, help="Log parses / bulk deletes per size")
+    parser.add_argument("--log-lines", type=int, default=20000)
+    parser.add_argument("--vendors", type=int, default=1000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of vendor/model popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache on")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "benchmark-results.json"))
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = args.rows[0]
+        print(json.dumps(asyncio.run(run_size(args))))
+        return
+
+    results = []
+    for rows in args.rows:
+        output = subprocess.run(
+            [sys.executable, __file__, *sys.argv[1:], "--rows", str(rows), "--child"],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {"meta": metadata(args), "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Mixed read/write concurrency benchmark.
+
+Runs the app in-process (httpx ASGI transport) against a throwaway SQLite
+database. READERS tasks issue single lookups and searches while WRITERS tasks
+(default 1) repeatedly import batches of new attributes through POST /import. Reports
+reader throughput and latency, writer commits/sec and the errors on each side
+("database is locked" surfaces as a 400 from the writer or a 500 from a reader).
+
+Each storage profile runs in a fresh process with its environment applied,
+e.g. WAL (the default) against the rollback journal:
+
+    pip install httpx
+    python benchmarks/concurrency_benchmark.py --profiles wal delete --readers 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import seed_rows  # noqa: E402
+
+# Environment applied for each --profiles name
+PROFILES = {
+    "wal": {"SQLITE_JOURNAL_MODE": "wal", "SQLITE_SYNCHRONOUS": "normal"},
+    "delete": {"SQLITE_JOURNAL_MODE": "delete", "SQLITE_SYNCHRONOUS": "full"},
+}
+
+
+def write_batch(batch, size):
+    lines = []
+    for i in range(size):
+        lines.append(json.dumps({
+            "uuid": f"{batch:08X}-{i:04X}-4000-9000-000000000000",
+            "vendor": "Writer",
+            "model": f"Batch {batch}",
+            "description": f"Imported service {i} of batch {batch}",
+            "attribute_type": "service",
+            "is_public": True,
+        }))
+    return "\n".join(lines) + "\n"
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+async def run_profile(args):
+    import httpx
+
+    logging.disable(logging.INFO)
+    tmpdir = tempfile.mkdtemp(prefix="uuid-concurrency-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/concurrency.db"
+    os.environ["RESPONSE_CACHE_TTL"] = "0"  # measure the database, not the cache
+    sys.path.insert(0, ROOT)
+    import test as api
+
+    await api.init_db()
+    async with api.SessionLocal() as db:
+        db.add_all(api.BLEAttribute(**row) for row in seed_rows(args.rows))
+        await db.commit()
+
+    rng = random.Random(42)
+    services = max(args.rows // 4, 1)
+    read_latencies = []
+    write_latencies = []
+    read_errors = write_errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def reader(client):
+        nonlocal read_errors
+        while time.perf_counter() < deadline:
+            i = rng.randrange(services)
+            if rng.random() < 0.6:
+                path = f"/attributes/{i:08X}-0000-4000-8000-000000000000"
+            else:
+                path = f"/attributes/?search=Service%20{i}&limit=20"
+            start = time.perf_counter()
+            response = await client.get(path)
+            read_latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                read_errors += 1
+
+    async def writer(client, first_batch):
+        nonlocal write_errors
+        batch = first_batch
+        while time.perf_counter() < deadline:
+            body = write_batch(batch, args.batch_size)
+            batch += args.writers
+            start = time.perf_counter()
+            response = await client.post("/import", params={"format": "ndjson"}, content=body)
+            write_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                write_errors += 1
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(writer(client, i) for i in range(args.writers)),
+            *(reader(client) for _ in range(args.readers))
+        )
+        elapsed = time.perf_counter() - start
+    await api.close_db()
+
+    return {
+        "reads_per_sec": len(read_latencies) / elapsed,
+        "read_p50_ms": percentile(read_latencies, 0.5),
+        "read_p99_ms": percentile(read_latencies, 0.99),
+        "read_errors": read_errors,
+        "writes_per_sec": len(write_latencies) / elapsed,
+        "write_p50_ms": percentile(write_latencies, 0.5),
+        "write_errors": write_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["wal", "delete"], choices=sorted(PROFILES))
+    parser.add_argument("--rows", type=int, default=20000, help="Rows to seed before the run")
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=500, help="Attributes per import")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    print(f"{'profile':>8} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'r err':>6} "
+          f"{'writes/s':>9} {'w p50 ms':>9} {'w err':>6}")
+    for name in args.profiles:
+        env = dict(os.environ, **PROFILES[name])
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", *sys.argv[1:]],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:>8} {result['reads_per_sec']:>9.1f} {result['read_p50_ms']:>8.2f} "
+              f"{result['read_p99_ms']:>8.2f} {result['read_errors']:>6} {result['writes_per_sec']:>9.1f} "
+              f"{result['write_p50_ms']:>9.2f} {result['write_errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
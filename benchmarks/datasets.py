@@ -0,0 +1,203 @@
+"""Synthetic, reproducible datasets for benchmarks.
+
+generate_attributes() yields attribute rows shaped like the community
+database: services with characteristics and some descriptors. Vendors follow
+a Zipf distribution (a few vendors own most rows), as do models within a
+vendor. Every vendor has a 128-bit base UUID whose first field is a counter,
+so many UUIDs share prefixes the way vendor-specific UUIDs do in practice.
+The standard SIG services come first, once each.
+
+generate_nrf_log() yields an nRF Connect log export (the `nrf_connect` dialect
+of /parse-log/): a discovery tree followed by notification/write/read traffic.
+
+The same seed always produces the same data. Either can be written as NDJSON
+(loadable with POST /import) or as a log file:
+
+    python benchmarks/datasets.py attributes --rows 1000000 > attributes.ndjson
+    python benchmarks/datasets.py log --lines 100000 > capture.txt
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+
+SIG_SERVICES = {
+    "1800": "Generic Access", "1801": "Generic Attribute", "180A": "Device Information",
+    "180D": "Heart Rate", "180F": "Battery Service", "1809": "Health Thermometer",
+    "1810": "Blood Pressure", "1816": "Cycling Speed and Cadence", "1818": "Cycling Power",
+    "181A": "Environmental Sensing", "181C": "User Data", "1826": "Fitness Machine",
+}
+SERVICE_NAMES = [
+    "Heart Rate", "Battery", "Device Information", "UART", "DFU", "Environmental Sensing",
+    "Fitness Machine", "Glucose", "Cycling Power", "Running Speed", "Pulse Oximeter", "Weight Scale",
+    "Motion", "Button", "LED", "Firmware Update", "Telemetry", "Configuration", "Audio", "Proximity",
+]
+CHARACTERISTIC_NAMES = [
+    "Measurement", "Control Point", "Data", "Status", "Feature", "Configuration", "Level",
+    "Command", "Response", "Notification", "Sensor Location", "Firmware Revision",
+]
+VENDOR_WORDS = [
+    "Acme", "Nordic", "Polar", "Garmin", "Fitbit", "Xiaomi", "Samsung", "Apple", "Suunto", "Wahoo",
+    "Withings", "Oura", "Whoop", "Tile", "Bose", "Jabra", "Logitech", "Philips", "Bosch", "Omron",
+]
+CCCD_DESCRIPTION = "Client Characteristic Configuration"
+
+
+def zipf_cumulative(count: int, skew: float) -> list[float]:
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def pick(rng: random.Random, cumulative: list[float]) -> int:
+    return bisect.bisect(cumulative, rng.random() * cumulative[-1])
+
+
+class Vendors:
+    """Vendor names, base UUIDs and models, with Zipf weights."""
+
+    def __init__(self, count: int, skew: float, seed: int):
+        rng = random.Random(seed)
+        self.names = [f"{VENDOR_WORDS[i % len(VENDOR_WORDS)]} {i}" for i in range(count)]
+        self.tails = [
+            f"{rng.randrange(1 << 16):04X}-{rng.randrange(1 << 16):04X}-"
+            f"{rng.randrange(1 << 16):04X}-{rng.randrange(1 << 48):012X}"
+            for _ in range(count)
+        ]
+        self.models = [[f"Model {i}-{m}" for m in range(1 + rng.randrange(20))] for i in range(count)]
+        self.cumulative = zipf_cumulative(count, skew)
+        self.model_cumulative = {}
+        self.skew = skew
+        self.counters = [0] * count
+
+    def choose(self, rng: random.Random) -> int:
+        return pick(rng, self.cumulative)
+
+    def model(self, rng: random.Random, vendor: int) -> str:
+        models = self.models[vendor]
+        cumulative = self.model_cumulative.get(len(models))
+        if cumulative is None:
+            cumulative = self.model_cumulative[len(models)] = zipf_cumulative(len(models), self.skew)
+        return models[pick(rng, cumulative)]
+
+    def next_uuid(self, vendor: int) -> str:
+        self.counters[vendor] += 1
+        return f"{self.counters[vendor]:08X}-{self.tails[vendor]}"
+
+
+def generate_attributes(count: int, seed: int = 0, vendors: int = 1000, skew: float = 1.1):
+    """Yield `count` attribute dicts (the POST /attributes/ fields)."""
+    rng = random.Random(seed)
+    produced = 0
+    for uuid, name in SIG_SERVICES.items():
+        if produced >= count:
+            return
+        yield {
+            "uuid": uuid, "vendor": "Bluetooth SIG", "model": "Generic", "description": name,
+            "attribute_type": "service", "service_uuid": None,
+        }
+        produced += 1
+
+    table = Vendors(vendors, skew, seed)
+    while produced < count:
+        vendor = table.choose(rng)
+        vendor_name = table.names[vendor]
+        model = table.model(rng, vendor)
+        service_name = rng.choice(SERVICE_NAMES)
+        service_uuid = table.next_uuid(vendor)
+        yield {
+            "uuid": service_uuid, "vendor": vendor_name, "model": model,
+            "description": f"{service_name} Service", "attribute_type": "service",
+            "service_uuid": None, "comment": f"{vendor_name} {model}",
+        }
+        produced += 1
+        # Mostly small services, occasionally large ones
+        for _ in range(min(1 + int(rng.expovariate(0.4)), 16)):
+            if produced >= count:
+                return
+            characteristic_uuid = table.next_uuid(vendor)
+            notify = rng.random() < 0.4
+            yield {
+                "uuid": characteristic_uuid, "vendor": vendor_name, "model": model,
+                "description": f"{service_name} {rng.choice(CHARACTERISTIC_NAMES)}",
+                "attribute_type": "characteristic", "service_uuid": service_uuid,
+                "can_read": rng.random() < 0.7, "can_write": rng.random() < 0.3,
+                "can_notify": notify, "can_indicate": rng.random() < 0.05,
+                "sample_data": f"0x{rng.randrange(1 << 32):08X}" if rng.random() < 0.5 else None,
+            }
+            produced += 1
+            if notify and produced < count:
+                yield {
+                    "uuid": table.next_uuid(vendor), "vendor": vendor_name, "model": model,
+                    "description": CCCD_DESCRIPTION, "attribute_type": "descriptor",
+                    "service_uuid": characteristic_uuid,
+                }
+                produced += 1
+
+
+NRF_PROPERTIES = ["R", "W", "N", "I", "WNR"]
+
+
+def generate_nrf_log(lines: int, seed: int = 0, services: int = 8):
+    """Yield `lines` nRF Connect log lines: discovery, then traffic and noise."""
+    rng = random.Random(seed)
+    tail = f"{rng.randrange(1 << 16):04X}-4000-8000-{rng.randrange(1 << 48):012X}".lower()
+    characteristics = []
+    produced = 0
+    for s in range(services):
+        if produced >= lines:
+            return
+        yield f"I\t12:00:00.{s:03d}\t{rng.choice(SERVICE_NAMES)} Service ({s + 1:04x}0000-{tail})"
+        produced += 1
+        for c in range(1 + rng.randrange(5)):
+            if produced >= lines:
+                return
+            uuid = f"{s + 1:04x}{c + 1:04x}-{tail}"
+            props = " ".join(sorted(set(rng.choices(NRF_PROPERTIES, k=2))))
+            yield f"I\t12:00:00.{s:03d}\t- {rng.choice(CHARACTERISTIC_NAMES)} [{props}] ({uuid})"
+            characteristics.append(uuid)
+            produced += 1
+
+    while produced < lines:
+        stamp = f"12:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(1000):03d}"
+        uuid = rng.choice(characteristics)
+        value = "-".join(f"{rng.randrange(256):02X}" for _ in range(1 + rng.randrange(8)))
+        kind = rng.random()
+        if kind < 0.6:
+            yield f"I\t{stamp}\tNotification received from {uuid}, value: (0x) {value}"
+        elif kind < 0.7:
+            yield f"I\t{stamp}\tData written to {uuid}, value: (0x) {value}"
+        elif kind < 0.8:
+            yield f"I\t{stamp}\tRead Response received from {uuid}, value: (0x) {value}"
+        elif kind < 0.85:
+            yield f"I\t{stamp}\tIndication received from {uuid}, value: (0x) {value}"
+        else:
+            yield f"D\t{stamp}\tgatt.readRemoteRssi() -> {-rng.randrange(40, 90)} dBm"
+        produced += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="kind", required=True)
+    attributes = sub.add_parser("attributes", help="NDJSON attributes on stdout")
+    attributes.add_argument("--rows", type=int, default=10000)
+    attributes.add_argument("--vendors", type=int, default=1000)
+    attributes.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of vendor/model popularity")
+    attributes.add_argument("--seed", type=int, default=0)
+    log = sub.add_parser("log", help="nRF Connect log on stdout")
+    log.add_argument("--lines", type=int, default=10000)
+    log.add_argument("--services", type=int, default=8)
+    log.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if args.kind == "attributes":
+        for row in generate_attributes(args.rows, args.seed, args.vendors, args.skew):
+            out.write(json.dumps(row) + "\n")
+    else:
+        for line in generate_nrf_log(args.lines, args.seed, args.services):
+            out.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
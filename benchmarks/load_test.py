@@ -0,0 +1,170 @@
+"""Concurrency load test for the API.
+
+Fires a fixed number of read requests at increasing concurrency levels and
+prints throughput per level. With the async engine, requests overlap while
+they wait on the database, so requests/sec should rise with concurrency
+instead of staying flat.
+
+By default the app runs in-process (httpx ASGI transport) against a throwaway
+SQLite database seeded with synthetic attributes. The client then shares the
+server's CPU, so only database time can overlap; pass --url to load-test a
+running server instead (e.g. uvicorn test:app) from a separate process/host.
+
+A local SQLite query is CPU work, so on a single core there is nothing to
+overlap and throughput stays flat. --db-latency adds a fixed wait to every
+SQLite statement, in the thread that runs it, like the round trip to a
+database server on the network. Requests can only overlap those waits if the
+app does not block the event loop on its queries:
+
+    pip install httpx
+    python benchmarks/load_test.py --requests 2000 --concurrency 1 4 16 64
+    python benchmarks/load_test.py --db-latency 2 --concurrency 1 4 16 64
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import httpx
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Wait `ms` milliseconds at the start of every statement on SQLite connections
+# opened from now on. The trace callback runs in the thread executing the
+# statement: an aiosqlite worker, or the caller's thread for the sync driver.
+def add_statement_latency(ms: float):
+    connect = sqlite3.connect
+    seconds = ms / 1000
+
+    def connect_with_latency(*args, **kwargs):
+        connection = connect(*args, **kwargs)
+        connection.set_trace_callback(lambda statement: time.sleep(seconds))
+        return connection
+
+    sqlite3.connect = connect_with_latency
+
+
+def seed_rows(count):
+    rows = []
+    for i in range(count // 4):
+        service_uuid = f"{i:08X}-0000-4000-8000-000000000000"
+        rows.append({
+            "uuid": service_uuid,
+            "vendor": f"Vendor {i % 50}",
+            "model": f"Model {i % 200}",
+            "description": f"Service {i}",
+            "attribute_type": "service",
+        })
+        for j in range(3):
+            rows.append({
+                "uuid": f"{i:08X}-{j + 1:04X}-4000-8000-000000000000",
+                "vendor": f"Vendor {i % 50}",
+                "model": f"Model {i % 200}",
+                "description": f"Characteristic {j} of service {i}",
+                "attribute_type": "characteristic",
+                "service_uuid": service_uuid,
+                "can_read": True,
+            })
+    return rows
+
+
+async def make_client(args):
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, timeout=60), None
+
+    tmpdir = tempfile.mkdtemp(prefix="uuid-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/load.db"
+    sys.path.insert(0, ROOT)
+    import test as api
+
+    await api.init_db()
+    async with api.SessionLocal() as db:
+        db.add_all(api.BLEAttribute(**row) for row in seed_rows(args.rows))
+        await db.commit()
+    # Connections opened for seeding run without it
+    await api.close_db()
+    if args.db_latency:
+        add_statement_latency(args.db_latency)
+
+    transport = httpx.ASGITransport(app=api.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60), api
+
+
+def request_paths(count, rows):
+    rng = random.Random(42)
+    paths = []
+    for _ in range(count):
+        i = rng.randrange(max(rows // 4, 1))
+        kind = rng.random()
+        if kind < 0.4:
+            paths.append(f"/attributes/{i:08X}-0000-4000-8000-000000000000")
+        elif kind < 0.7:
+            paths.append(f"/attributes/?search=Service%20{i}&limit=20")
+        else:
+            paths.append(f"/attributes/?attribute_type=service&skip={rng.randrange(rows // 4)}&limit=20")
+    return paths
+
+
+async def run_level(client, paths, concurrency):
+    queue = iter(paths)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for path in queue:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(paths),
+        "errors": errors,
+        "rps": len(paths) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows to seed for the in-process app")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--db-latency", type=float, default=0,
+                        help="Milliseconds added to every SQLite statement (in-process app only)")
+    args = parser.parse_args()
+
+    client, api = await make_client(args)
+    paths = request_paths(args.requests, args.rows)
+    async with client:
+        await run_level(client, paths[:50], 1)  # warm up
+        print(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for level in args.concurrency:
+            result = await run_level(client, paths, level)
+            print(f"{result['concurrency']:>11} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f} {result['errors']:>6}")
+    if api is not None:
+        # Both pools: leftover aiosqlite threads would keep the interpreter alive
+        await api.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""Micro-benchmark for the log line classifier.
+
+Generates a synthetic LightBlue-style log (discovery lines, value updates,
+writes, notifications and unrelated noise) and reports lines/sec for:
+
+  before  the chained substring checks + split() loop that parse_log used
+          before log_parser's compiled dialect classifier (kept here verbatim
+          as a reference, with the same cached uuid_key)
+  after   log_parser.LogParser with the "lightblue" dialect, fed FEED_LINES
+          lines at a time as parse_log_file() does
+
+Both produce the same attributes for UUID-named items; only throughput is
+compared.
+
+    python benchmarks/parser_benchmark.py --lines 2000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ble_uuid import uuid_key  # noqa: E402
+from log_parser import FEED_LINES, LogParser  # noqa: E402
+
+CHARACTERISTICS = [
+    "2A37", "2A38", "2A19", "2A29",
+    "6E400002-B5A3-F393-E0A9-E50E24DCCA9E", "6E400003-B5A3-F393-E0A9-E50E24DCCA9E",
+]
+
+
+def generate_log(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    lines = [
+        "12:00:00.000 Discovered 180D, 180F and 6E400001-B5A3-F393-E0A9-E50E24DCCA9E Services",
+        "12:00:00.001 Discovered 2A37, 2A38, 2A19, 2A29, 6E400002-B5A3-F393-E0A9-E50E24DCCA9E "
+        "and 6E400003-B5A3-F393-E0A9-E50E24DCCA9E Characteristics",
+    ]
+    while len(lines) < count:
+        kind = rng.random()
+        uuid = rng.choice(CHARACTERISTICS)
+        stamp = f"12:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(1000):03d}"
+        if kind < 0.70:
+            lines.append(f"{stamp} Updated Value of Characteristic {uuid} to 0x{rng.randrange(1 << 16):04X}")
+        elif kind < 0.78:
+            lines.append(f"{stamp} Writing value 0x{rng.randrange(256):02X} to {uuid} Characteristic")
+        elif kind < 0.82:
+            lines.append(f"{stamp} Setting Boolean true for Notifying Characteristic {uuid}")
+        else:
+            lines.append(f"{stamp} Peripheral RSSI changed to -{rng.randrange(40, 90)} dBm")
+    return lines
+
+
+def legacy_parse(lines: list[str]) -> dict:
+    key = uuid_key
+    characteristics = {}
+    for line in lines:
+        if "Discovered" in line and "Services" in line:
+            service_part = line.split('Discovered ')[1].split(' Services')[0].strip()
+            if ',' in service_part:
+                items = service_part.split(',')
+                if ' and ' in items[-1]:
+                    items = items[:-1] + items[-1].split(' and ')
+            else:
+                items = service_part.split(' and ')
+            for item in items:
+                item = item.strip()
+                if any(c in item for c in '0123456789ABCDEF-'):
+                    key(item)
+        elif "Discovered" in line and "Characteristics" in line:
+            char_part = line.split('Discovered ')[1].split(' Characteristics')[0]
+            if ',' in char_part:
+                items = char_part.split(',')
+                if ' and ' in items[-1]:
+                    items = items[:-1] + items[-1].split(' and ')
+            else:
+                items = char_part.split(' and ')
+            for item in items:
+                item = item.strip()
+                if any(c in item for c in '0123456789ABCDEF-'):
+                    characteristics[key(item)] = {'uuid': item, 'can_read': False, 'can_write': False,
+                                                  'can_notify': False, 'sample_data': None}
+        elif "Setting Boolean true for Notifying Characteristic" in line:
+            k = key(line.split('Characteristic ')[1])
+            if k in characteristics:
+                characteristics[k]['can_notify'] = True
+        elif "Writing value" in line and "to" in line:
+            k = key(line.split('to ')[1].split(' Characteristic')[0])
+            if k in characteristics:
+                characteristics[k]['can_write'] = True
+        elif "Updated Value of Characteristic" in line:
+            parts = line.split('Characteristic ')[1].split(' to ')
+            k = key(parts[0])
+            if k in characteristics:
+                characteristics[k]['can_read'] = True
+                characteristics[k]['sample_data'] = parts[1].strip()
+    return characteristics
+
+
+def compiled_parse(lines: list[str]) -> dict:
+    parser = LogParser("Vendor", "Model")
+    for i in range(0, len(lines), FEED_LINES):
+        parser.feed_lines(lines[i:i + FEED_LINES])
+    return parser.characteristics
+
+
+def measure(name: str, parse, lines: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(lines)
+        best = min(best, time.perf_counter() - start)
+    rate = len(lines) / best
+    print(f"{name:>7}: {rate:>12,.0f} lines/s  ({best:.2f}s for {len(lines):,} lines)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = generate_log(args.lines)
+    before = measure("before", legacy_parse, lines, args.repeat)
+    after = measure("after", compiled_parse, lines, args.repeat)
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Serialization benchmark for attribute listings.
+
+Renders the first N rows of GET /attributes/ (services with their nested
+children) both ways and reports the time per response:
+
+  pydantic  ORM objects + selectinload(children), validated through
+            List[BLEAttributeNestedResponse] with from_attributes and encoded
+            with json.dumps (what response_model did for every request)
+  fast      column tuples + one children query, nested in one pass and
+            encoded with orjson (test.render_attributes)
+
+Runs against a throwaway SQLite database seeded with synthetic attributes.
+
+    python benchmarks/serialization_benchmark.py --rows 100 1000 10000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import seed_rows  # noqa: E402
+
+
+async def pydantic_path(api, adapter, db, limit):
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    result = await db.execute(
+        select(api.BLEAttribute).options(selectinload(api.BLEAttribute.children)).order_by(api.BLEAttribute.id).limit(limit)
+    )
+    attributes = result.scalars().all()
+    content = adapter.dump_python(adapter.validate_python(attributes, from_attributes=True), mode="json")
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+async def fast_path(api, db, limit):
+    import orjson
+    from sqlalchemy import select
+
+    fields = api.NESTED_FIELDS
+    result = await db.execute(select(*api.attribute_columns(fields)).order_by(api.BLEAttribute.id).limit(limit))
+    return orjson.dumps(await api.render_attributes(db, result.all(), fields))
+
+
+async def measure(render, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await render()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="uuid-serialize-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/serialize.db"
+    logging.disable(logging.INFO)
+    import test as api
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[api.BLEAttributeNestedResponse])
+    await api.init_db()
+    async with api.SessionLocal() as db:
+        db.add_all(api.BLEAttribute(**row) for row in seed_rows(max(args.rows)))
+        await db.commit()
+
+    print(f"{'rows':>8} {'pydantic':>12} {'fast':>12} {'speedup':>8}")
+    async with api.SessionLocal() as db:
+        for limit in args.rows:
+            slow, slow_body = await measure(lambda: pydantic_path(api, adapter, db, limit), args.repeat)
+            fast, fast_body = await measure(lambda: fast_path(api, db, limit), args.repeat)
+            assert json.loads(slow_body) == json.loads(fast_body)
+            print(f"{limit:>8} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>7.1f}x")
+    await api.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""Cold-start benchmark.
+
+Every run starts a fresh interpreter, the way a new worker does, and measures:
+
+  import         importing the app module (test.py)
+  startup        building the app and running its startup (schema, job workers)
+  first_request  the first GET /attributes/?limit=1 once started
+  total          from spawning the interpreter to the first response
+
+Runs use either a new, empty database (the schema is created) or an existing
+one (created by a warm-up run). Medians are printed with min/max:
+
+    pip install httpx
+    python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ["import", "startup", "first_request", "total"]
+
+
+async def serve_first_request(app) -> float:
+    import httpx
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/attributes/", params={"limit": 1})
+            response.raise_for_status()
+        answered = time.time()
+        first_request = time.perf_counter() - started
+    return started - start, first_request, answered
+
+
+def child(database: str):
+    spawned = float(os.environ["STARTUP_BENCH_SPAWNED"])
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["JOB_DIR"] = os.path.join(os.path.dirname(database), "jobs")
+    sys.path.insert(0, ROOT)
+
+    start = time.perf_counter()
+    import test as api
+    imported = time.perf_counter() - start
+
+    import logging
+    logging.disable(logging.WARNING)
+    start = time.perf_counter()
+    app = api.app
+    built = time.perf_counter() - start
+    startup, first_request, answered = asyncio.run(serve_first_request(app))
+    print(json.dumps({
+        "import": imported,
+        "startup": built + startup,
+        "first_request": first_request,
+        "total": answered - spawned,
+    }))
+
+
+def run(database: str) -> dict:
+    env = dict(os.environ, STARTUP_BENCH_SPAWNED=repr(time.time()))
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", database], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Runs per database state")
+    parser.add_argument("--output", help="Write the raw timings as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix="uuid-startup-")
+    existing = os.path.join(tmpdir, "existing.db")
+    run(existing)
+
+    results = {"new": [], "existing": []}
+    for i in range(args.runs):
+        results["new"].append(run(os.path.join(tmpdir, f"new-{i}.db")))
+        results["existing"].append(run(existing))
+
+    print(f"{'database':<10} {'metric':<14} {'median ms':>10} {'min ms':>9} {'max ms':>9}")
+    for state, runs in results.items():
+        for metric in METRICS:
+            values = [r[metric] * 1000 for r in runs]
+            print(f"{state:<10} {metric:<14} {statistics.median(values):>10.1f} "
+                  f"{min(values):>9.1f} {max(values):>9.1f}")
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import re
+from functools import lru_cache
+from uuid import UUID, uuid5
+
+# Bluetooth base UUID: 16/32-bit short forms expand to xxxxxxxx-0000-1000-8000-00805F9B34FB
+BLUETOOTH_BASE_UUID = UUID("00000000-0000-1000-8000-00805F9B34FB")
+BLUETOOTH_BASE_SUFFIX = "-0000-1000-8000-00805F9B34FB"
+
+# Namespace for keys of identifiers that are not Bluetooth UUIDs at all
+# (hand-made ids such as "6C53DB001"), so every row still gets a stable key
+NON_UUID_NAMESPACE = UUID("6f70656e-7575-6964-8000-000000000000")
+
+_HEX_RE = re.compile(r"[0-9A-Fa-f]+")
+
+# 128-bit (dashed or bare), 32-bit or 16-bit UUID, optionally 0x-prefixed.
+# Usable as a building block inside larger patterns.
+UUID_PATTERN = (
+    r"(?:0[xX])?(?:[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}"
+    r"|[0-9A-Fa-f]{32}|[0-9A-Fa-f]{8}|[0-9A-Fa-f]{4})"
+)
+UUID_RE = re.compile(UUID_PATTERN)
+
+
+def _strip(value: str) -> str:
+    value = value.strip()
+    if value.startswith("{") and value.endswith("}"):
+        value = value[1:-1]
+    if value[:2] in ("0x", "0X"):
+        value = value[2:]
+    return value
+
+
+def parse_uuid(value: str) -> UUID | None:
+    value = _strip(value)
+    if _HEX_RE.fullmatch(value):
+        if len(value) == 4:
+            value = "0000" + value
+        if len(value) == 8:
+            return UUID(value + BLUETOOTH_BASE_SUFFIX)
+        if len(value) == 32:
+            return UUID(value)
+    elif len(value) == 36 and value.count("-") == 4:
+        try:
+            return UUID(value)
+        except ValueError:
+            pass
+    return None
+
+
+def is_uuid(value: str) -> bool:
+    return UUID_RE.fullmatch(value.strip()) is not None
+
+
+# Canonical 16-byte key: "2a00", "0x2A00" and "00002A00-0000-1000-8000-00805F9B34FB"
+# all map to the same bytes. Anything that is not a UUID gets a case-insensitive
+# name-based key instead. Cached: logs and imports repeat the same few UUIDs.
+@lru_cache(maxsize=65536)
+def uuid_key(value: str) -> bytes:
+    parsed = parse_uuid(value)
+    if parsed is not None:
+        return parsed.bytes
+    return uuid5(NON_UUID_NAMESPACE, _strip(value).upper()).bytes
+
@@ -0,0 +1,53 @@
+"""Import a directory of BLE capture logs.
+
+Every matching file under DIRECTORY is parsed in parallel in a process pool
+(LOG_WORKERS processes, default: one per core); the results are merged and
+written to the database configured by DATABASE_URL in a single transaction.
+
+    python ingest_logs.py captures/ --vendor Polar --model H10
+    python ingest_logs.py captures/ --pattern "*.txt" --dialect nrf_connect
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import test as api
+from log_parser import DEFAULT_DIALECT, DIALECTS
+
+
+async def run(args) -> dict:
+    paths = sorted(str(path) for path in Path(args.directory).rglob(args.pattern) if path.is_file())
+    if not paths:
+        raise SystemExit(f"No files matching {args.pattern!r} under {args.directory}")
+
+    await api.init_db()
+    try:
+        async with api.SessionLocal() as db:
+            result = await api.ingest_log_files(
+                db, paths, args.vendor, args.model, args.description, args.dialect, args.force
+            )
+            await db.commit()
+    finally:
+        await api.close_db()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--pattern", default="*.log", help="glob matched recursively (default: *.log)")
+    parser.add_argument("--vendor", default="Unknown")
+    parser.add_argument("--model", default="Unknown")
+    parser.add_argument("--description")
+    parser.add_argument("--dialect", default=DEFAULT_DIALECT, choices=sorted(DIALECTS))
+    parser.add_argument("--force", action="store_true", help="parse files already imported before")
+    args = parser.parse_args()
+
+    json.dump(asyncio.run(run(args)), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+import codecs
+import re
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, NamedTuple
+from uuid import UUID, uuid5
+
+from assigned_numbers import assigned_name
+from ble_uuid import UUID_PATTERN, is_uuid, uuid_key
+
+
+def split_items(part: str) -> list[str]:
+    # "A, B and C" / "A and B" / "A"
+    if ',' in part:
+        items = part.split(',')
+        if ' and ' in items[-1]:
+            last_items = items[-1].split(' and ')
+            items = items[:-1] + last_items
+    else:
+        items = part.split(' and ')
+    return [item.strip() for item in items]
+
+
+# "0x2a00" -> "2A00", "6e400001-b5a3-..." -> "6E400001-B5A3-..."
+def clean_uuid(value: str) -> str:
+    value = value.strip()
+    if value[:2] in ("0x", "0X"):
+        value = value[2:]
+    return value.upper()
+
+
+# Log dialects
+#
+# A dialect is a table of rules. Each rule names a literal keyword that every
+# line of its kind contains, a regex that extracts the fields, and a handler
+# that applies the match to the parser. The keywords of a dialect are compiled
+# into one plain alternation, so most lines (including noise) are classified by
+# a single regex scan; only the rules filed under the keyword found are then
+# tried. Rules without a keyword (e.g. indented tree output) are tried when no
+# keyword matches.
+#
+# Update rules only change fields of an attribute already discovered, named by
+# their `uuid` group, and only the last of a run of such lines for the same
+# UUID decides the result (flags set to true, the last value). LogParser.
+# feed_lines() hands a dialect's other lines to classify() one by one, in order,
+# and scans the runs between them for each update rule in one finditer() over
+# the joined text, applying only the last match per UUID. In a dialect without
+# keyword-less rules this is what makes most lines cost no Python code at all.
+class Rule(NamedTuple):
+    name: str
+    keyword: str | None
+    pattern: str
+    handler: Callable[["LogParser", re.Match], None]
+    update: bool = False
+
+
+class LogDialect:
+    def __init__(self, name: str, rules: list[Rule]):
+        self.name = name
+        self.rules = rules
+        self.table: dict[str, list[tuple[re.Pattern, Callable]]] = {}
+        self.fallback: list[tuple[re.Pattern, Callable]] = []
+        self.updates: list[tuple[re.Pattern, Callable]] = []
+        for rule in rules:
+            entry = (re.compile(rule.pattern), rule.handler)
+            if rule.keyword is None:
+                self.fallback.append(entry)
+            else:
+                self.table.setdefault(rule.keyword, []).append(entry)
+            if rule.update:
+                self.updates.append((re.compile(rule.pattern, re.MULTILINE), rule.handler))
+        # Keywords of the lines classified one by one in feed_lines()
+        update_keywords = {rule.keyword for rule in rules if rule.update}
+        self.line_keywords = [rule.keyword for rule in rules if not rule.update and rule.keyword not in update_keywords]
+        self.bulk = bool(self.updates) and not self.fallback
+        # No groups: named groups in an alternation disable the literal-prefix
+        # scan and make the search several times slower
+        keywords = sorted(self.table, key=len, reverse=True)
+        self.keywords = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+
+    def classify(self, line: str) -> tuple[re.Match, Callable] | None:
+        found = self.keywords.search(line) if self.keywords is not None else None
+        candidates = self.table[found.group()] if found is not None else self.fallback
+        for regex, handler in candidates:
+            match = regex.search(line)
+            if match is not None:
+                return match, handler
+        return None
+
+
+DIALECTS: dict[str, LogDialect] = {}
+DEFAULT_DIALECT = "lightblue"
+# Lines per LogParser.feed_lines() call when reading a whole log
+FEED_LINES = 10000
+
+# Namespace of the placeholder UUIDs given to attributes a log names without a
+# UUID (see LogParser.placeholder_uuid)
+PLACEHOLDER_NAMESPACE = UUID("6f70656e-7575-6964-8000-000000000001")
+
+
+def register_dialect(dialect: LogDialect) -> LogDialect:
+    DIALECTS[dialect.name] = dialect
+    return dialect
+
+
+# Incremental state machine over classified BLE log lines.
+#
+# Lines are fed one at a time, so callers can stream a log of any size. State is
+# kept per discovered attribute, not per line; drain() hands out the records
+# created or changed since the last drain so they can be written in batches.
+# Standard UUIDs are labelled with their assigned name whatever the log calls
+# them (LightBlue only prints the UUID, nRF Connect prints "Unknown Service"
+# for anything it does not know).
+class LogParser:
+    def __init__(
+        self,
+        vendor: str | None = None,
+        model: str | None = None,
+        description: str | None = None,
+        dialect: str = DEFAULT_DIALECT
+    ):
+        self.vendor = vendor
+        self.model = model
+        self.comment = f'Automatically parsed from log: {description or "No description provided"}'
+        self.dialect = DIALECTS[dialect]
+        self.services = {}
+        self.characteristics = {}
+        self.current_service = None
+        self.pending_flags = {}
+        # Dialect state for logs whose lines depend on the block they are in:
+        # the block's header, the last handle printed (start, end) and the
+        # handle range of every service discovered
+        self.block = None
+        self.handles = None
+        self.service_handles = []
+        self.lines = 0
+        self._written = set()
+        self._new = []
+        self._dirty = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._new) + len(self._dirty)
+
+    def feed(self, line: str):
+        self.lines += 1
+        classified = self.dialect.classify(line)
+        if classified is not None:
+            match, handler = classified
+            handler(self, match)
+
+    # Same result as feed() for each line, see Rule for how update rules are
+    # applied in bulk
+    def feed_lines(self, lines: list[str]):
+        dialect = self.dialect
+        if not dialect.bulk:
+            for line in lines:
+                self.feed(line)
+            return
+        self.lines += len(lines)
+        text = "\n".join(lines)
+        starts = set()
+        for keyword in dialect.line_keywords:
+            position = text.find(keyword)
+            while position >= 0:
+                starts.add(text.rfind("\n", 0, position) + 1)
+                position = text.find(keyword, position + len(keyword))
+        start = 0
+        for line_start in sorted(starts):
+            self._apply_updates(text, start, line_start)
+            line_end = text.find("\n", line_start)
+            if line_end < 0:
+                line_end = len(text)
+            classified = dialect.classify(text[line_start:line_end])
+            if classified is not None:
+                match, handler = classified
+                handler(self, match)
+            start = line_end + 1
+        self._apply_updates(text, start, len(text))
+
+    def _apply_updates(self, text: str, start: int, end: int):
+        if start >= end:
+            return
+        for regex, handler in self.dialect.updates:
+            # findall() and dict() keep the last groups per UUID in C; a
+            # handler gets them as a mapping like the match it would get
+            found = regex.findall(text, start, end)
+            if regex.groups == 1:
+                last = dict.fromkeys(found)
+            else:
+                last = dict(zip(map(itemgetter(regex.groupindex["uuid"] - 1), found), found))
+            if len({uuid_key(uuid) for uuid in last}) < len(last):
+                # One UUID spelled several ways: only the order of the lines is right
+                for match in regex.finditer(text, start, end):
+                    handler(self, match)
+                continue
+            names = sorted(regex.groupindex, key=regex.groupindex.get)
+            for uuid, groups in last.items():
+                handler(self, {"uuid": uuid} if groups is None else dict(zip(names, groups)))
+
+    def add_service(self, uuid: str, description: str):
+        key = uuid_key(uuid)
+        if key not in self.services:
+            description = assigned_name(uuid) or description
+            self.services[key] = {
+                'uuid': uuid,
+                'vendor': self.vendor,
+                'model': self.model,
+                'description': description,
+                'attribute_type': 'service',
+                'comment': self.comment
+            }
+            self._new.append(key)
+        self.current_service = self.services[key]['uuid']
+
+    def add_characteristic(self, uuid: str, description: str, **flags):
+        key = uuid_key(uuid)
+        description = assigned_name(uuid) or description
+        if key in self.characteristics:
+            # Rediscovered (e.g. after a reconnect): keep what was learned so far
+            self.set(uuid, service_uuid=self.current_service, description=description, **flags)
+            return
+        self.characteristics[key] = {
+            'uuid': uuid,
+            'vendor': self.vendor,
+            'model': self.model,
+            'description': description,
+            'service_uuid': self.current_service,
+            'attribute_type': 'characteristic',
+            'can_read': False,
+            'can_write': False,
+            'can_notify': False,
+            'can_indicate': False,
+            'sample_data': None,
+            'comment': self.comment
+        }
+        self.characteristics[key].update(flags)
+        self._new.append(key)
+
+    # Derived from what the log says, so parsing the same log again (or another
+    # capture of the same device) gives the same UUID rather than a new row.
+    # Characteristics include their service: "Data" is not unique on a device.
+    def placeholder_uuid(self, kind: str, name: str) -> str:
+        service = self.current_service if kind == 'Characteristic' else None
+        return str(uuid5(PLACEHOLDER_NAMESPACE, "\0".join(
+            value or "" for value in (self.vendor, self.model, service, kind, name)
+        )))
+
+    # Update a known characteristic; unknown UUIDs are ignored
+    def set(self, uuid: str, **values):
+        key = uuid_key(uuid.strip())
+        record = self.characteristics.get(key)
+        if record is None:
+            return
+        changed = False
+        for field, value in values.items():
+            if record[field] != value:
+                record[field] = value
+                changed = True
+        if changed and key in self._written:
+            self._dirty.add(key)
+
+    # Records discovered since the last drain, followed by already-drained
+    # characteristics that changed since. Services come first so
+    # characteristics never precede their service.
+    def drain(self) -> list[dict]:
+        new_services = [self.services[key] for key in self._new if key in self.services]
+        new_characteristics = [self.characteristics[key] for key in self._new if key not in self.services]
+        changed = [self.characteristics[key] for key in self._dirty]
+        self._written.update(self._new)
+        self._new = []
+        self._dirty = set()
+        return new_services + new_characteristics + changed
+
+    def records(self) -> list[dict]:
+        return list(self.services.values()) + list(self.characteristics.values())
+
+
+# iOS LightBlue (the original /parse-log/ format):
+#   Discovered 180D, 180F and Battery Services
+#   Discovered 2A37 and 2A38 Characteristics
+#   Setting Boolean true for Notifying Characteristic 2A37
+#   Writing value 0x01 to 2A38 Characteristic
+#   Updated Value of Characteristic 2A37 to 0x0048
+# Named items without a UUID get a placeholder UUID and keep the name.
+def _lightblue_items(parser: LogParser, items: str, kind: str):
+    for item in split_items(items):
+        if is_uuid(item):
+            yield item, f'{kind} {item}'
+        else:
+            yield parser.placeholder_uuid(kind, item), item
+
+
+def _lightblue_services(parser: LogParser, match: re.Match):
+    for uuid, description in _lightblue_items(parser, match['items'], 'Service'):
+        parser.add_service(uuid, description)
+
+
+def _lightblue_characteristics(parser: LogParser, match: re.Match):
+    for uuid, description in _lightblue_items(parser, match['items'], 'Characteristic'):
+        parser.add_characteristic(uuid, description)
+
+
+register_dialect(LogDialect("lightblue", [
+    Rule("services", "Discovered ", r"Discovered (?P<items>.+?) Services", _lightblue_services),
+    Rule("characteristics", "Discovered ", r"Discovered (?P<items>.+?) Characteristics",
+         _lightblue_characteristics),
+    Rule("notify", "Setting Boolean true for Notifying Characteristic ",
+         r"Setting Boolean true for Notifying Characteristic (?P<uuid>\S+)",
+         lambda parser, m: parser.set(m['uuid'], can_notify=True), update=True),
+    Rule("write", "Writing value", r"Writing value.*? to (?P<uuid>\S+)",
+         lambda parser, m: parser.set(m['uuid'], can_write=True), update=True),
+    Rule("value", "Updated Value of Characteristic ",
+         r"Updated Value of Characteristic (?P<uuid>\S+) to (?P<data>.*)",
+         lambda parser, m: parser.set(m['uuid'], can_read=True, sample_data=m['data'].strip()), update=True),
+]))
+
+
+# nRF Connect (Android/desktop) log export. Discovery is printed as a tree:
+#   Nordic UART Service (6e400001-b5a3-f393-e0a9-e50e24dcca9e)
+#   - TX Characteristic [N] (6e400003-b5a3-f393-e0a9-e50e24dcca9e)
+# followed by traffic lines such as
+#   Notification received from 6e400003-..., value: (0x) 48-65-6C
+#   Data written to 6e400002-..., value: (0x) 01
+#   Read Response received from 00002a00-..., value: (0x) 4E-6F
+NRF_PROPERTIES = {"R": "can_read", "W": "can_write", "WNR": "can_write", "N": "can_notify", "I": "can_indicate"}
+_NRF_PREFIX = r"^(?:[VDIWEA]\t[\d:.]+\t)?"
+_NRF_VALUE = r"(?:, value: \(0x\) ?(?P<value>[0-9A-Fa-f-]*))?"
+
+
+def _nrf_characteristic(parser: LogParser, match: re.Match):
+    flags = {NRF_PROPERTIES[p]: True for p in match['props'].split() if p in NRF_PROPERTIES}
+    parser.add_characteristic(clean_uuid(match['uuid']), match['name'].strip(), **flags)
+
+
+def _nrf_traffic(keyword: str, flag: str) -> Rule:
+    def handler(parser: LogParser, match: re.Match):
+        values = {flag: True}
+        if match['value']:
+            values['sample_data'] = '0x' + match['value'].replace('-', '')
+        parser.set(clean_uuid(match['uuid']), **values)
+    return Rule(flag, keyword, rf"{keyword}(?P<uuid>{UUID_PATTERN}){_NRF_VALUE}", handler)
+
+
+register_dialect(LogDialect("nrf_connect", [
+    _nrf_traffic("Notification received from ", "can_notify"),
+    _nrf_traffic("Indication received from ", "can_indicate"),
+    _nrf_traffic("Data written to ", "can_write"),
+    _nrf_traffic("Read Response received from ", "can_read"),
+    Rule("characteristic", None, _NRF_PREFIX + rf"- (?P<name>.*?) \[(?P<props>[A-Z ]*)\] "
+         rf"\((?P<uuid>{UUID_PATTERN})\)\s*$", _nrf_characteristic),
+    Rule("service", None, _NRF_PREFIX + rf"(?P<name>[^\s\-][^\t]*?) \((?P<uuid>{UUID_PATTERN})\)\s*$",
+         lambda parser, m: parser.add_service(clean_uuid(m['uuid']), m['name'].strip())),
+]))
+
+
+# BlueZ btmon text output. Android HCI snoop captures (btsnoop_hci.log) are
+# binary; decode them with `btmon -r btsnoop_hci.log` and parse the result with
+# this dialect. Primary service and characteristic discovery responses print:
+#       ATT: Read By Group Type Response (0x11) len 13
+#         Handle range: 0x000c-0x0011
+#         UUID: Heart Rate (0x180d)
+#       ATT: Read By Type Response (0x09) len 8
+#         Handle: 0x000d
+#         Properties: 0x12
+#         Value UUID: Heart Rate Measurement (0x2a37)
+# "UUID:" lines are services only inside a Read By Group Type Response (Find
+# Information Responses list descriptors the same way). Services are listed
+# before any characteristic is discovered, so a characteristic belongs to the
+# service whose handle range holds its declaration handle. The Properties line
+# precedes the Value UUID it describes.
+BTMON_PROPERTY_BITS = {0x02: "can_read", 0x04: "can_write", 0x08: "can_write", 0x10: "can_notify", 0x20: "can_indicate"}
+BTMON_SERVICES_BLOCK = "Read By Group Type Response"
+BTMON_CHARACTERISTICS_BLOCK = "Read By Type Response"
+
+
+def _btmon_block(parser: LogParser, block: str | None):
+    parser.block = block
+    parser.handles = None
+    parser.pending_flags = {}
+
+
+def _btmon_handles(parser: LogParser, match: re.Match):
+    start = int(match['start'], 16)
+    parser.handles = (start, int(match['end'], 16) if match['end'] else start)
+
+
+def _btmon_service(parser: LogParser, match: re.Match):
+    if parser.block != BTMON_SERVICES_BLOCK:
+        return
+    parser.add_service(clean_uuid(match['uuid']), match['name'].strip())
+    if parser.handles is not None:
+        parser.service_handles.append((*parser.handles, parser.current_service))
+
+
+def _btmon_properties(parser: LogParser, match: re.Match):
+    bits = int(match['value'], 16)
+    parser.pending_flags = {flag: True for bit, flag in BTMON_PROPERTY_BITS.items() if bits & bit}
+
+
+def _btmon_characteristic(parser: LogParser, match: re.Match):
+    if parser.block != BTMON_CHARACTERISTICS_BLOCK:
+        return
+    flags, parser.pending_flags = parser.pending_flags, {}
+    if parser.handles is not None:
+        handle = parser.handles[0]
+        for start, end, service in reversed(parser.service_handles):
+            if start <= handle <= end:
+                parser.current_service = service
+                break
+    parser.add_characteristic(clean_uuid(match['uuid']), match['name'].strip(), **flags)
+
+
+register_dialect(LogDialect("btmon", [
+    Rule("att", "ATT: ", r"^\s+ATT: (?P<operation>.+?) \(0x[0-9a-fA-F]{2}\)",
+         lambda parser, m: _btmon_block(parser, m['operation'])),
+    Rule("handle_range", "Handle range: ",
+         r"^\s+Handle range: (?P<start>0x[0-9a-fA-F]{4})-(?P<end>0x[0-9a-fA-F]{4})", _btmon_handles),
+    Rule("handle", "Handle: ", r"^\s+Handle: (?P<start>0x[0-9a-fA-F]{4})(?P<end>)", _btmon_handles),
+    Rule("characteristic", "Value UUID: ",
+         rf"^\s+Value UUID: (?P<name>.+?) \((?P<uuid>{UUID_PATTERN})\)\s*$", _btmon_characteristic),
+    Rule("service", "UUID: ", rf"^\s+UUID: (?P<name>.+?) \((?P<uuid>{UUID_PATTERN})\)\s*$", _btmon_service),
+    Rule("properties", "Properties: ", r"^\s+Properties: (?P<value>0x[0-9a-fA-F]{2})\s*$", _btmon_properties),
+    # A new frame (< > @ = in the first column) ends the ATT block
+    Rule("frame", None, r"^[<>@=] ", lambda parser, m: _btmon_block(parser, None)),
+]))
+
+
+# Parse a whole log file and return (lines parsed, records). Top-level and
+# free of shared state so it can run in a worker process.
+def parse_log_file(
+    path: str,
+    vendor: str | None = None,
+    model: str | None = None,
+    description: str | None = None,
+    dialect: str = DEFAULT_DIALECT
+) -> tuple[int, list[dict]]:
+    parser = LogParser(vendor, model, description, dialect)
+    with open(path, encoding="utf-8", errors="replace") as log_file:
+        while lines := [line.rstrip("\n") for line in islice(log_file, FEED_LINES)]:
+            parser.feed_lines(lines)
+    return parser.lines, parser.records()
+
+
+# Split a stream of byte chunks into decoded lines without holding more than
+# one chunk (plus a partial line) in memory
+async def iter_lines(chunks, encoding: str = "utf-8"):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    remainder = ""
+    async for chunk in chunks:
+        text = remainder + decoder.decode(chunk)
+        lines = text.split("\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    remainder += decoder.decode(b"", final=True)
+    if remainder:
+        yield remainder.rstrip("\r")
@@ -0,0 +1,89 @@
+import cProfile
+import io
+import itertools
+import pstats
+import time
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional; cProfile is used instead
+    Profiler = None
+
+
+# One profiled request: the statements it ran with their timings, and a call
+# profile of the request. pyinstrument follows the request's task across
+# awaits; cProfile (the fallback) records everything on the event loop thread
+# while the request runs, including other requests served in between. Only
+# one call profile runs at a time (a thread has one active profiler); a
+# request profiled meanwhile records its statements only.
+class RequestProfile:
+    ids = itertools.count(1)
+    capturing = False
+    max_queries = 1000
+
+    def __init__(self, method: str, path: str, top: int = 40):
+        self.id = next(RequestProfile.ids)
+        self.method = method
+        self.path = path
+        self.top = top
+        self.started_at = time.time()
+        self.status = None
+        self.duration = None
+        self.queries: list[tuple[str, float]] = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.report = None
+        self._profiler = None
+        self._start = None
+
+    def add_query(self, statement: str, seconds: float):
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.queries) < self.max_queries:
+            self.queries.append((statement, seconds))
+
+    def start(self):
+        if not RequestProfile.capturing:
+            RequestProfile.capturing = True
+            self._profiler = Profiler(async_mode="enabled") if Profiler is not None else cProfile.Profile()
+            if Profiler is not None:
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._start
+        if self._profiler is None:
+            self.report = "(not captured: another request was being profiled)"
+            return
+        if Profiler is not None:
+            self._profiler.stop()
+            self.report = self._profiler.output_text(unicode=False, color=False)
+        else:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(self.top)
+            self.report = out.getvalue()
+        self._profiler = None
+        RequestProfile.capturing = False
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "query_count": self.query_count,
+            "query_seconds": self.query_seconds
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "queries": [{"statement": statement, "seconds": seconds} for statement, seconds in self.queries],
+            "profiler": "pyinstrument" if Profiler is not None else "cProfile",
+            "report": self.report
+        }
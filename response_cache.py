@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+# In-process LRU cache of rendered read responses.
+#
+# Entries are either attribute entries, keyed ("attribute", uuid_key), or
+# listing entries, keyed by any other tuple (e.g. the normalized query of
+# GET /attributes/). A write invalidates the attribute entries of the UUIDs it
+# touched and every listing entry, since any row can appear in any listing.
+#
+# Readers take the generation before querying and pass it to put(); a result
+# computed across an invalidation is dropped instead of caching stale data.
+# Invalidation only sees this process's writes, so values start with the
+# database version they were rendered at and readers pass the current one to
+# get(): an entry rendered at another version is dropped as a miss.
+class ResponseCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.listings: set[Hashable] = set()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, version: int | None = None) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic() and (version is None or entry[1][0] == version):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        if not self.enabled or generation != self.generation:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        if key[0] != "attribute":
+            self.listings.add(key)
+        while len(self.entries) > self.max_size:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def invalidate(self, uuid_keys):
+        self.generation += 1
+        self.invalidations += 1
+        for key in uuid_keys:
+            self._drop(("attribute", key))
+        for key in list(self.listings):
+            self._drop(key)
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += 1
+        self.entries.clear()
+        self.listings.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    def _drop(self, key: Hashable):
+        self.entries.pop(key, None)
+        self.listings.discard(key)
@@ -1,37 +1,152 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, UploadFile, File
-from sqlalchemy import create_engine, Column, String, Integer, Enum, ForeignKey, Boolean
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Query, UploadFile, File, Form, Header, Request, Response
+from sqlalchemy import Column, String, Integer, Float, Enum, ForeignKey, Boolean, LargeBinary, Text, text, true, inspect, select, delete, update, and_, or_, func, event, literal, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, backref
-from pydantic import BaseModel
-from sqlalchemy.exc import IntegrityError
-from uuid import uuid4 as generate_uuid
+from sqlalchemy.orm import relationship, backref, validates, selectinload, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy.exc import IntegrityError, OperationalError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import collections
+import contextvars
+import binascii
+import csv
 import enum
-from typing import List
+import hashlib
+import io
+import json
+import operator
+import os
+import random
+import re
+import socket
+import tempfile
+import time
+import uuid as uuid_lib
+import zlib
+from typing import Callable, List
 import logging
 
+import orjson
+
+from assigned_numbers import ASSIGNED_NUMBERS_VERSION, AssignedNumber, company_name, lookup_assigned
+from ble_uuid import is_uuid, uuid_key
+from log_parser import DEFAULT_DIALECT, DIALECTS, LogParser, iter_lines, parse_log_file
+from metrics import Registry
+from profiling import RequestProfile
+from response_cache import ResponseCache
+from trigram_index import TrigramIndex
+
 # Add near the top of the file
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="Bluetooth Characteristics Mapper")
+# Routes are collected on a router; create_app() (at the end) builds the app
+router = APIRouter()
+
+# Database configuration
+# DATABASE_URL may name a sync driver (sqlite://, postgresql://); it is mapped
+# onto the matching asyncio driver (aiosqlite, asyncpg)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+SQLALCHEMY_DATABASE_URL = async_database_url(
+    os.environ.get("DATABASE_URL", "sqlite:///./bluetooth_characteristics.db")
 )
 
-# Database configuration
-SQLALCHEMY_DATABASE_URL = "sqlite:///./bluetooth_characteristics.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Storage profile. SQLite connections are switched to WAL on connect, so
+# readers no longer block behind a committing writer, and a writer that finds
+# the database locked retries for busy_timeout ms instead of failing. An empty
+# value leaves that pragma at SQLite's default. The pool settings apply to
+# file databases and Postgres alike.
+SQLITE_PRAGMAS = {
+    "busy_timeout": os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"),
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "wal"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "normal"),
+    "cache_size": os.environ.get("SQLITE_CACHE_SIZE", "-65536"),  # negative: KiB, i.e. 64 MiB
+    "mmap_size": os.environ.get("SQLITE_MMAP_SIZE", "268435456"),
+}
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))
+DB_WRITE_TIMEOUT = float(os.environ.get("DB_WRITE_TIMEOUT", 300))
+
+def sqlite_pragmas(pragmas: dict):
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value:
+                cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+    return apply
+
+def make_engine(url: str, pragmas: dict = SQLITE_PRAGMAS, **pool_options):
+    options = {}
+    # In-memory SQLite uses a single static connection, which takes no sizing.
+    # File databases get a real pool (aiosqlite defaults to opening, and
+    # re-applying the pragmas to, a new connection per checkout).
+    if not (url.startswith("sqlite") and (":memory:" in url or url.endswith("://"))):
+        if url.startswith("sqlite"):
+            options["poolclass"] = AsyncAdaptedQueuePool
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=not url.startswith("sqlite"),
+        )
+        options.update(pool_options)
+    new_engine = create_async_engine(url, **options)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", sqlite_pragmas(pragmas))
+    return new_engine
+
+# Read/write routing. Reads use read_engine: DATABASE_READ_URL (e.g. a Postgres
+# replica) if set, otherwise read-only connections to the same SQLite file,
+# which in WAL mode read their own snapshot while an import is writing.
+# Writes use engine. On SQLite its pool holds a single connection, so writers
+# queue (for up to DB_WRITE_TIMEOUT seconds) instead of failing with "database
+# is locked".
+def read_only_url(url: str) -> str | None:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return parsed.set(
+        database=f"file:{parsed.database}", query={**parsed.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
+READ_METHODS = {"GET", "HEAD"}
+
+if make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite":
+    engine = make_engine(SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0, pool_timeout=DB_WRITE_TIMEOUT)
+else:
+    engine = make_engine(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_READ_URL = (
+    async_database_url(os.environ["DATABASE_READ_URL"]) if os.environ.get("DATABASE_READ_URL")
+    else read_only_url(SQLALCHEMY_DATABASE_URL)
+)
+if SQLALCHEMY_READ_URL:
+    # The journal mode is the writer's to set
+    read_engine = make_engine(
+        SQLALCHEMY_READ_URL, {name: value for name, value in SQLITE_PRAGMAS.items() if name != "journal_mode"}
+    )
+else:
+    read_engine = engine
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Enum for BLE attribute types
@@ -46,11 +161,13 @@ class BLEAttribute(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     uuid = Column(String, unique=True, index=True)
+    # Canonical 16-byte form of uuid (short forms expanded), see ble_uuid.uuid_key
+    uuid_key = Column(LargeBinary(16), unique=True, index=True)
     vendor = Column(String, index=True)
     model = Column(String, index=True)
     description = Column(String)
     attribute_type = Column(Enum(BLEAttributeType))
-    service_uuid = Column(String, ForeignKey('ble_attributes.uuid'), nullable=True)
+    service_uuid = Column(String, ForeignKey('ble_attributes.uuid'), nullable=True, index=True)
     sample_data = Column(String, nullable=True)
     can_read = Column(Boolean, default=False)
     can_write = Column(Boolean, default=False)
@@ -67,6 +184,74 @@ class BLEAttribute(Base):
         foreign_keys=[service_uuid]  # Add this to be explicit about the foreign key
     )
 
+    # Database version of the last write that changed this row or its children
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"), index=True)
+
+    @validates("uuid")
+    def _set_uuid_key(self, key, value):
+        self.uuid_key = uuid_key(value) if value is not None else None
+        return value
+
+# Single row (id 1) counting committed writes to ble_attributes
+class DatabaseVersion(Base):
+    __tablename__ = "db_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Schema revision the database was last migrated to (see init_db)
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+# Background log import. The upload is spooled to `path` until the job finishes.
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    filename = Column(String)
+    path = Column(String)
+    vendor = Column(String)
+    model = Column(String)
+    description = Column(String)
+    dialect = Column(String, nullable=False)
+    lines_parsed = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    result = Column(Text)  # JSON
+    error = Column(String)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+    # Ledger digest of the spooled log (see log_digest)
+    digest = Column(String(64))
+    # Worker running the job and when it last reported progress (see run_job)
+    owner = Column(String)
+    heartbeat = Column(Float)
+
+# Import ledger: one row per distinct log imported (see log_digest)
+class ImportedLog(Base):
+    __tablename__ = "imported_logs"
+
+    digest = Column(String(64), primary_key=True)
+    filename = Column(String)
+    vendor = Column(String)
+    model = Column(String)
+    dialect = Column(String, nullable=False)
+    lines_parsed = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    # Times submitted, duplicates included
+    imports = Column(Integer, nullable=False, default=0)
+    created_at = Column(Float, nullable=False)
+    last_seen_at = Column(Float, nullable=False)
+
 # Pydantic models for request/response
 class BLEAttributeBase(BaseModel):
     uuid: str
@@ -99,20 +284,623 @@ class BLEAttributeNestedResponse(BLEAttributeResponse):
         orm_mode = True
         from_attributes = True
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+class BLEAttributeTreeResponse(BLEAttributeResponse):
+    children: List["BLEAttributeTreeResponse"] = []
+
+class BLEAttributeFuzzyResponse(BLEAttributeResponse):
+    score: float
+
+# Partial update: only the fields sent are changed. Unknown fields are
+# rejected, and so is null for the fields every attribute has.
+class BLEAttributeUpdate(BaseModel):
+    vendor: str | None = None
+    model: str | None = None
+    description: str | None = None
+    attribute_type: BLEAttributeType | None = None
+    service_uuid: str | None = None
+    sample_data: str | None = None
+    can_read: bool | None = None
+    can_write: bool | None = None
+    can_indicate: bool | None = None
+    can_notify: bool | None = None
+    comment: str | None = None
+
+    class Config:
+        extra = "forbid"
+
+    @field_validator(
+        "vendor", "model", "description", "attribute_type", "can_read", "can_write", "can_indicate", "can_notify"
+    )
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+    # null detaches the attribute; anything else must at least be a UUID
+    @field_validator("service_uuid")
+    @classmethod
+    def service_uuid_format(cls, value):
+        if value is not None and not is_uuid(value):
+            raise ValueError("must be a 16-, 32- or 128-bit UUID")
+        return value
+
+# A single attribute can also be renamed
+class BLEAttributePatch(BLEAttributeUpdate):
+    uuid: str | None = None
+
+    @field_validator("uuid")
+    @classmethod
+    def uuid_not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+class BLEAttributeBatchUpdate(BaseModel):
+    uuids: List[str] | None = None
+    changes: BLEAttributeUpdate
+
+# Bring databases created before uuid_key existed up to date
+def migrate_uuid_key(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("ble_attributes")}
+    if "uuid_key" in columns:
+        return
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
+    column_type = LargeBinary(16).compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE ble_attributes ADD COLUMN uuid_key {column_type}"))
+
+    seen = set()
+    updates = []
+    for row_id, uuid in connection.execute(text("SELECT id, uuid FROM ble_attributes ORDER BY id")):
+        key = uuid_key(uuid)
+        if key in seen:
+            # Same UUID stored under another spelling; keep the oldest row keyed
+            logger.warning(f"Duplicate UUID {uuid} (id {row_id}) left without uuid_key")
+            continue
+        seen.add(key)
+        updates.append({"id": row_id, "uuid_key": key})
+    if updates:
+        connection.execute(text("UPDATE ble_attributes SET uuid_key = :uuid_key WHERE id = :id"), updates)
+
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_ble_attributes_uuid_key ON ble_attributes (uuid_key)"
+    ))
+
+def migrate_versions(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("ble_attributes")}
+    if "version" not in columns:
+        connection.execute(text("ALTER TABLE ble_attributes ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+    if connection.execute(select(DatabaseVersion.id).where(DatabaseVersion.id == 1)).first() is None:
+        connection.execute(DatabaseVersion.__table__.insert().values(id=1, version=0))
+
+def migrate_job_digest(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("import_jobs")}
+    if "digest" not in columns:
+        connection.execute(text("ALTER TABLE import_jobs ADD COLUMN digest VARCHAR(64)"))
+
+def migrate_job_heartbeat(connection):
+    columns = {c["name"] for c in inspect(connection).get_columns("import_jobs")}
+    if "owner" not in columns:
+        connection.execute(text("ALTER TABLE import_jobs ADD COLUMN owner VARCHAR"))
+    if "heartbeat" not in columns:
+        connection.execute(text("ALTER TABLE import_jobs ADD COLUMN heartbeat FLOAT"))
+
+# Children are looked up by service_uuid (nesting, tree building, cascades),
+# rows written since a version by version (fuzzy index catch-up)
+def migrate_indexes(connection):
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ble_attributes_service_uuid ON ble_attributes (service_uuid)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ble_attributes_version ON ble_attributes (version)"
+    ))
+
+# Full-text search index over uuid/vendor/model/description (SQLite FTS5).
+# It is an external-content table over ble_attributes, kept in sync by triggers
+# so every insert/update/delete path (ORM or bulk) updates it. The trigram
+# tokenizer matches substrings anywhere in a word ("bit" finds "Fitbit"), as
+# the ILIKE filter it replaced did; an index built with the word tokenizer is
+# rebuilt.
+FTS_TABLE = "ble_attributes_fts"
+FTS_COLUMNS = ("uuid", "vendor", "model", "description")
+# bm25 column weights, in FTS_COLUMNS order: UUID hits rank above text hits
+FTS_WEIGHTS = (10.0, 2.0, 2.0, 1.0)
+
+def setup_search_index(connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+
+    definition = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).scalar()
+    if definition is not None and "trigram" not in definition:
+        connection.execute(text(f"DROP TABLE {FTS_TABLE}"))
+        definition = None
+    exists = definition is not None
+
+    columns = ", ".join(FTS_COLUMNS)
+    new_columns = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_columns = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
     try:
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{columns}, content='ble_attributes', content_rowid='id', tokenize='trigram')"
+        ))
+    except OperationalError as e:
+        logger.warning(f"FTS5 unavailable, search falls back to ILIKE: {e}")
+        return False
+
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS ble_attributes_fts_ai AFTER INSERT ON ble_attributes BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_columns}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS ble_attributes_fts_ad AFTER DELETE ON ble_attributes BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns}); END"
+    ))
+    # Only updates of indexed columns touch the index (not e.g. version bumps)
+    connection.execute(text("DROP TRIGGER IF EXISTS ble_attributes_fts_au"))
+    connection.execute(text(
+        f"CREATE TRIGGER ble_attributes_fts_au AFTER UPDATE OF {columns} ON ble_attributes BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_columns}); END"
+    ))
+
+    # Index rows that were stored before the search index existed
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+fts_enabled = False
+
+# Bump SCHEMA_VERSION when adding a migration. A database below it gets the
+# tables created, every migration run and the new version stamped; one at it
+# (every later start, and every other worker) only has the stamp read.
+SCHEMA_VERSION = 5
+
+def schema_version(connection) -> int:
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return 0
+    return connection.execute(select(SchemaVersion.version).where(SchemaVersion.id == 1)).scalar() or 0
+
+def migrate(connection) -> bool:
+    Base.metadata.create_all(connection)
+    migrate_uuid_key(connection)
+    migrate_versions(connection)
+    migrate_indexes(connection)
+    migrate_job_digest(connection)
+    migrate_job_heartbeat(connection)
+    search_index = setup_search_index(connection)
+    connection.execute(delete(SchemaVersion))
+    connection.execute(SchemaVersion.__table__.insert().values(id=1, version=SCHEMA_VERSION))
+    return search_index
+
+def search_index_exists(connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first() is not None
+
+# Create database tables, migrate and set up the search index, if needed
+async def init_db():
+    global fts_enabled
+    async with engine.begin() as connection:
+        if await connection.run_sync(schema_version) >= SCHEMA_VERSION:
+            fts_enabled = await connection.run_sync(search_index_exists)
+        else:
+            logger.info(f"Migrating database schema to version {SCHEMA_VERSION}")
+            fts_enabled = await connection.run_sync(migrate)
+    if FUZZY_INDEX == "startup":
+        start_fuzzy_build()
+
+async def close_db():
+    global log_pool
+    await stop_job_workers()
+    await stop_fuzzy_index()
+    if log_pool is not None:
+        log_pool.shutdown()
+        log_pool = None
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+# Turn free text into an FTS5 query: every whitespace-separated term must occur
+# as a substring, each quoted (so "-" and other punctuation are safe), e.g.
+# 9FA480E0-49 -> "9FA480E0-49". The trigram index cannot match terms shorter
+# than three characters; those searches return None and use ILIKE.
+def build_fts_query(search: str) -> str | None:
+    terms = search.split()
+    if not terms or any(len(term) < 3 for term in terms):
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+# Dependency to get database session: the read pool for GET/HEAD, the writer
+# for everything else
+async def get_db(request: Request):
+    sessionmaker = ReadSessionLocal if request.method in READ_METHODS else SessionLocal
+    async with sessionmaker() as db:
         yield db
-    finally:
-        db.close()
+
+# Reads that must see every commit go to the writer: a DATABASE_READ_URL
+# replica can lag, and would 404 a job just submitted or let the fuzzy index
+# record a version whose rows it never read
+async def get_write_db():
+    async with SessionLocal() as db:
+        yield db
+
+async def get_attribute(db: AsyncSession, uuid: str) -> BLEAttribute | None:
+    result = await db.execute(
+        select(BLEAttribute)
+        .where(BLEAttribute.uuid_key == uuid_key(uuid))
+        .options(selectinload(BLEAttribute.children))
+    )
+    return result.scalars().first()
+
+# Fuzzy lookup (GET /attributes/fuzzy) through an in-process trigram index of
+# uuid, description, vendor and model (trigram_index.py). FUZZY_INDEX=lazy
+# builds it on the first fuzzy request, startup builds it in the background
+# at startup, off disables the endpoint. The build reads the table in id
+# batches through the read pool. Every fuzzy request (on the writer, see
+# get_write_db) first catches the index up from the database: rows stamped
+# with a version above the one it reflects are read back (through the version
+# index) and applied, so writes by other workers and by ingest_logs.py show up
+# as well as this process's own. Deleted rows are dropped from the index when
+# a search returns them. Rows are added in a worker thread, so the event loop
+# keeps serving requests during a build or a long catch-up. The index being built is private until it is swapped in;
+# the live one is only changed, and searched, under fuzzy_lock.
+FUZZY_INDEX = os.environ.get("FUZZY_INDEX", "lazy")
+FUZZY_BATCH_SIZE = 10000
+FUZZY_COLUMNS = (
+    BLEAttribute.id, BLEAttribute.uuid, BLEAttribute.description, BLEAttribute.vendor, BLEAttribute.model
+)
+fuzzy_index: TrigramIndex | None = None
+fuzzy_build: asyncio.Task | None = None
+fuzzy_lock = asyncio.Lock()
+
+# One id batch of the rows matching `where`
+async def fuzzy_batch(db: AsyncSession, where, last_id: int) -> list:
+    result = await db.execute(
+        select(*FUZZY_COLUMNS)
+        .where(where, BLEAttribute.id > last_id)
+        .order_by(BLEAttribute.id)
+        .limit(FUZZY_BATCH_SIZE)
+    )
+    return result.all()
+
+async def build_fuzzy_index() -> TrigramIndex:
+    global fuzzy_index
+    start = time.perf_counter()
+    index = TrigramIndex()
+    # Writes committed during the build are caught up on the next request
+    async with ReadSessionLocal() as db:
+        index.version = await database_version(db)
+    last_id = 0
+    while True:
+        async with ReadSessionLocal() as db:
+            rows = await fuzzy_batch(db, true(), last_id)
+        if not rows:
+            break
+        await asyncio.to_thread(index.add_many, rows)
+        last_id = rows[-1][0]
+    fuzzy_index = index
+    logger.info(f"Fuzzy index built: {len(index)} attributes in {time.perf_counter() - start:.1f}s")
+    return index
+
+async def catch_up_fuzzy_index(db: AsyncSession, index: TrigramIndex):
+    version = await database_version(db)
+    if version <= index.version:
+        return
+    async with fuzzy_lock:
+        if version <= index.version:
+            return
+        # A row written again since is stamped with a newer version, so
+        # everything above index.version is its current state
+        last_id = 0
+        while rows := await fuzzy_batch(db, BLEAttribute.version > index.version, last_id):
+            await asyncio.to_thread(index.add_many, rows)
+            last_id = rows[-1][0]
+        index.version = version
+
+def start_fuzzy_build() -> asyncio.Task:
+    global fuzzy_build
+    # Also retries a build that failed or was cancelled
+    if fuzzy_build is None or (fuzzy_build.done() and fuzzy_index is None):
+        fuzzy_build = asyncio.create_task(build_fuzzy_index())
+    return fuzzy_build
+
+async def get_fuzzy_index(db: AsyncSession) -> TrigramIndex:
+    if fuzzy_index is not None:
+        index = fuzzy_index
+    elif FUZZY_INDEX == "off":
+        raise HTTPException(status_code=404, detail="Fuzzy search is disabled")
+    else:
+        # Requests waiting for the build must not cancel it
+        index = await asyncio.shield(start_fuzzy_build())
+    # A cancelled request must not release fuzzy_lock while a thread is still
+    # adding rows
+    await asyncio.shield(catch_up_fuzzy_index(db, index))
+    return index
+
+async def stop_fuzzy_index():
+    global fuzzy_index, fuzzy_build
+    if fuzzy_build is not None and not fuzzy_build.done():
+        fuzzy_build.cancel()
+        try:
+            await fuzzy_build
+        except asyncio.CancelledError:
+            pass
+    fuzzy_index = None
+    fuzzy_build = None
 
 # API Routes
-@app.post("/attributes/", response_model=BLEAttributeResponse)
-async def create_attribute(attribute: BLEAttributeCreate, db: SessionLocal = Depends(get_db)):
+# Response cache and versioning for attribute reads. Write routes call
+# mark_stale() with the UUIDs they touch, including the parent service, whose
+# nested response lists its children. On commit the database version is
+# bumped and stamped on those rows (before_commit, inside the transaction).
+# Their response cache entries are invalidated after the commit; a rollback
+# drops the marks. Other workers and ingest_logs.py write too, so a cached
+# response is only served while its version is still the current one.
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 30))
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+def mark_stale(db: AsyncSession, uuids):
+    db.sync_session.info.setdefault("stale_keys", set()).update(uuid_key(uuid) for uuid in uuids if uuid)
+
+@event.listens_for(Session, "before_commit")
+def bump_versions(session):
+    stale_keys = session.info.get("stale_keys")
+    if not stale_keys:
+        return
+    session.flush()
+    version = session.execute(
+        update(DatabaseVersion)
+        .where(DatabaseVersion.id == 1)
+        .values(version=DatabaseVersion.version + 1)
+        .returning(DatabaseVersion.version)
+    ).scalar_one()
+    keys = list(stale_keys)
+    for i in range(0, len(keys), UPSERT_BATCH_SIZE):
+        session.execute(
+            update(BLEAttribute)
+            .where(BLEAttribute.uuid_key.in_(keys[i:i + UPSERT_BATCH_SIZE]))
+            .values(version=version)
+            .execution_options(synchronize_session=False)
+        )
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session):
+    stale_keys = session.info.pop("stale_keys", None)
+    if stale_keys:
+        response_cache.invalidate(stale_keys)
+
+@event.listens_for(Session, "after_rollback")
+def discard_stale_keys(session):
+    session.info.pop("stale_keys", None)
+
+# Conditional GET: listings carry the database version as their ETag, single
+# attributes their row version. A one-value version lookup decides the 304,
+# and whether the cached response is current, before any rows are loaded or
+# rendered.
+HTTP_CACHE_CONTROL = os.environ.get("HTTP_CACHE_CONTROL", "no-cache")
+
+async def database_version(db: AsyncSession) -> int:
+    result = await db.execute(select(DatabaseVersion.version).where(DatabaseVersion.id == 1))
+    return result.scalar_one()
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL})
+
+def cached_json(body: bytes, cache_status: str, etag: str, next_cursor: str | None = None) -> Response:
+    headers = {"X-Cache": cache_status, "ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Serve a response built from many rows (listings, trees): cached and tagged
+# with the database version. render() returns (body, next_cursor).
+async def versioned_json(db: AsyncSession, cache_key: tuple, if_none_match: str | None, render) -> Response:
+    generation = response_cache.generation
+    version = await database_version(db)
+    etag = f'"{version}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cached = response_cache.get(cache_key, version)
+    if cached is not None:
+        _, body, next_cursor = cached
+        return cached_json(body, "HIT", etag, next_cursor)
+
+    body, next_cursor = await render()
+    response_cache.put(cache_key, (version, body, next_cursor), generation)
+    return cached_json(body, "MISS", etag, next_cursor)
+
+@router.get("/cache/stats")
+async def read_cache_stats():
+    return response_cache.stats()
+
+# Metrics, scraped from GET /metrics. A plain ASGI middleware times every
+# request by route template; cursor events count statements and their time
+# against the current request's route (through a ContextVar), or "background"
+# for job workers and startup. Nothing is formatted until a scrape.
+# METRICS_ENABLED=0 leaves the middleware out, and the cursor hooks too unless
+# profiling or an explicitly set SLOW_QUERY_SECONDS (below) needs them.
+# Parse throughput is rate(log_lines_parsed_total) / rate(log_parse_seconds_total).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+metrics = Registry()
+request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Request latency", ("method", "route", "status")
+)
+request_queries = metrics.histogram(
+    "http_request_db_queries", "Database statements per request", ("route",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000)
+)
+db_queries = metrics.counter("db_queries_total", "Database statements executed", ("route",))
+db_query_seconds = metrics.counter("db_query_seconds_total", "Time spent in database statements", ("route",))
+log_lines_parsed = metrics.counter("log_lines_parsed_total", "Log lines parsed", ("dialect",))
+log_records_parsed = metrics.counter("log_records_parsed_total", "Attributes written from parsed logs", ("dialect",))
+log_parse_seconds = metrics.counter("log_parse_seconds_total", "Time spent parsing and writing logs", ("dialect",))
+log_duplicate_imports = metrics.counter(
+    "log_duplicate_imports_total", "Log imports skipped as already imported", ("dialect",)
+)
+metrics.callback("response_cache_hits_total", "Response cache hits", "counter", lambda: response_cache.hits)
+metrics.callback("response_cache_misses_total", "Response cache misses", "counter", lambda: response_cache.misses)
+metrics.callback("response_cache_evictions_total", "Response cache evictions", "counter", lambda: response_cache.evictions)
+metrics.callback(
+    "response_cache_invalidations_total", "Response cache invalidations", "counter", lambda: response_cache.invalidations
+)
+metrics.callback("response_cache_entries", "Entries in the response cache", "gauge", lambda: len(response_cache.entries))
+
+# [statement count, seconds] of the request being served
+request_db_stats: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_db_stats", default=None)
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = request_db_stats.get()
+    if stats is None:
+        db_queries.inc(("background",))
+        db_query_seconds.inc(("background",), elapsed)
+    else:
+        stats[0] += 1
+        stats[1] += elapsed
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_query(statement, elapsed)
+    if SLOW_QUERY_SECONDS and elapsed >= SLOW_QUERY_SECONDS:
+        log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = request_db_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_db_stats.reset(token)
+            # Label by template (/attributes/{uuid}), not by path
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            request_seconds.observe(elapsed, (scope["method"], route, status))
+            request_queries.observe(stats[0], (route,))
+            if stats[0]:
+                db_queries.inc((route,), stats[0])
+                db_query_seconds.inc((route,), stats[1])
+
+@router.get("/metrics")
+async def read_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Request profiling. With PROFILE_REQUESTS=1, a request sent with "X-Profile: 1"
+# is profiled; PROFILE_SAMPLE_RATE profiles that fraction of all requests. A
+# profiled request keeps its statements with their timings and a call profile
+# (pyinstrument if installed, otherwise cProfile), answers with an
+# X-Profile-Id header and is listed at GET /debug/profiles (the last
+# PROFILE_HISTORY). Independently, statements slower than SLOW_QUERY_SECONDS
+# (0 disables; 0.5 by default, 0 with METRICS_ENABLED=0) are logged with their
+# query plan.
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_HISTORY = int(os.environ.get("PROFILE_HISTORY", 20))
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", 0.5 if METRICS_ENABLED else 0))
+recent_profiles: collections.deque[RequestProfile] = collections.deque(maxlen=PROFILE_HISTORY)
+current_profile: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar("current_profile", default=None)
+
+# Only DML is explained (a failed EXPLAIN would abort a Postgres
+# transaction). The plan runs on a raw DBAPI cursor, bypassing the cursor events.
+EXPLAINABLE = re.compile(r"\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+def log_slow_query(conn, statement, parameters, elapsed, executemany):
+    plan = "(no plan)"
+    if not executemany and EXPLAINABLE.match(statement):
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+            finally:
+                cursor.close()
+        except Exception as e:
+            plan = f"(plan not available: {e})"
+    logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {statement}\n{plan}")
+
+def profile_requested(scope) -> bool:
+    if PROFILE_REQUESTS:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return value not in (b"", b"0")
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            return await self.app(scope, receive, send)
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        token = current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            current_profile.reset(token)
+            recent_profiles.append(profile)
+
+if METRICS_ENABLED or PROFILE_REQUESTS or PROFILE_SAMPLE_RATE > 0 or SLOW_QUERY_SECONDS:
+    for metered_engine in {engine, read_engine}:
+        event.listen(metered_engine.sync_engine, "before_cursor_execute", start_query_timer)
+        event.listen(metered_engine.sync_engine, "after_cursor_execute", stop_query_timer)
+
+@router.get("/debug/profiles")
+async def list_profiles():
+    return [profile.summary() for profile in reversed(recent_profiles)]
+
+@router.get("/debug/profiles/{profile_id}")
+async def read_profile(profile_id: int):
+    for profile in recent_profiles:
+        if profile.id == profile_id:
+            return profile.to_dict()
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+@router.post("/attributes/", response_model=BLEAttributeResponse)
+async def create_attribute(attribute: BLEAttributeCreate, db: AsyncSession = Depends(get_db)):
     # Require service_uuid for characteristics and descriptors
     if attribute.attribute_type != BLEAttributeType.SERVICE and not attribute.service_uuid:
         raise HTTPException(
@@ -122,37 +910,161 @@ async def create_attribute(attribute: BLEAttributeCreate, db: SessionLocal = Dep
     
     # Validate service reference
     if attribute.service_uuid:
-        service = db.query(BLEAttribute).filter(
-            BLEAttribute.uuid == attribute.service_uuid,
-            BLEAttribute.attribute_type == BLEAttributeType.SERVICE
-        ).first()
+        service = await get_attribute(db, attribute.service_uuid)
+        if service and service.attribute_type != BLEAttributeType.SERVICE:
+            service = None
         if not service:
             raise HTTPException(status_code=400, detail="Referenced service not found")
+        # Point at the service's stored spelling so the children relationship matches
+        attribute.service_uuid = service.uuid
     
     db_attribute = BLEAttribute(**attribute.dict())
     db.add(db_attribute)
+    mark_stale(db, [attribute.uuid, attribute.service_uuid])
     try:
-        db.commit()
-        db.refresh(db_attribute)
+        await db.commit()
+        await db.refresh(db_attribute)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="UUID already exists")
     return db_attribute
 
-@app.get("/attributes/", response_model=List[BLEAttributeNestedResponse])
-async def read_attributes(
-    skip: int = 0,
-    limit: int = 100,
-    search: str | None = None,
-    attribute_type: BLEAttributeType | None = None,
-    show_all: bool = True,
-    db: SessionLocal = Depends(get_db)
-):
-    query = db.query(BLEAttribute)
+# Opaque keyset pagination cursors: the sort key of the last row on a page
+# (id, plus the bm25 rank for ranked searches), as url-safe base64 JSON
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, ranked: bool) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(position.get("id"), int):
+            raise ValueError("cursor has no id")
+        if ranked and not isinstance(position.get("rank"), float):
+            raise ValueError("cursor has no rank")
+    except (ValueError, AttributeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+# Read responses are built from plain column tuples instead of ORM objects
+# validated through the response models: one query for the page, one for the
+# children of its services (grouped in a single pass), encoded with orjson.
+# The output matches BLEAttributeNestedResponse; `fields` picks a subset of
+# its fields (e.g. fields=uuid,description,children).
+ATTRIBUTE_FIELDS = tuple(BLEAttributeResponse.model_fields)
+NESTED_FIELDS = ATTRIBUTE_FIELDS + ("children",)
+
+# Standard attributes (Bluetooth SIG assigned numbers) nobody has stored are
+# answered from the built-in table (assigned_numbers.py); id 0 marks them. A
+# stored row for the same UUID always takes precedence.
+def assigned_attribute(assigned: AssignedNumber, fields: tuple[str, ...]) -> dict:
+    item = {
+        "uuid": assigned.uuid,
+        "vendor": "Bluetooth SIG",
+        "model": "Assigned Numbers",
+        "description": assigned.name,
+        "attribute_type": assigned.attribute_type,
+        "service_uuid": None,
+        "sample_data": None,
+        "can_read": False,
+        "can_write": False,
+        "can_indicate": False,
+        "can_notify": False,
+        "comment": None,
+        "id": 0,
+        "children": []
+    }
+    return {field: item[field] for field in fields}
+
+def parse_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return NESTED_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(NESTED_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in NESTED_FIELDS if field in requested)
+
+def attribute_columns(fields: tuple[str, ...]) -> list:
+    # id and uuid are always selected: they drive pagination and nesting
+    names = ["id", "uuid"] + [f for f in fields if f not in ("id", "uuid", "children")]
+    return [getattr(BLEAttribute, name) for name in names]
+
+# itemgetter returns a bare value for a single index; always return a tuple
+def row_picker(indexes: list[int]):
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda row: (row[index],)
+    return operator.itemgetter(*indexes) if indexes else lambda row: ()
+
+async def attribute_stored(db: AsyncSession, uuid: str) -> bool:
+    result = await db.execute(select(BLEAttribute.id).where(BLEAttribute.uuid_key == uuid_key(uuid)))
+    return result.first() is not None
+
+async def render_attributes(db: AsyncSession, rows, fields: tuple[str, ...]) -> list[dict]:
+    names = [column.key for column in attribute_columns(fields)]
+    row_fields = [f for f in fields if f != "children"]
+    pick = row_picker([names.index(f) for f in row_fields])
+
+    items = [dict(zip(row_fields, pick(row))) for row in rows]
+    if "children" not in fields:
+        return items
+
+    children: dict[str, list[dict]] = {row[1]: [] for row in rows}
+    child_columns = attribute_columns(fields) + [BLEAttribute.service_uuid.label("parent_uuid")]
+    parents = list(children)
+    for i in range(0, len(parents), UPSERT_BATCH_SIZE):
+        result = await db.execute(
+            select(*child_columns)
+            .where(BLEAttribute.service_uuid.in_(parents[i:i + UPSERT_BATCH_SIZE]))
+            .order_by(BLEAttribute.id)
+        )
+        for row in result:
+            children[row[-1]].append(dict(zip(row_fields, pick(row))))
+    for row, item in zip(rows, items):
+        item["children"] = children[row[1]]
+    return items
+
+async def render_attribute_page(
+    db: AsyncSession,
+    fields: tuple[str, ...],
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    search: str | None,
+    attribute_type: BLEAttributeType | None,
+    show_all: bool
+) -> tuple[bytes, str | None]:
+    query = select(*attribute_columns(fields))
+    rank = None
+    # A standard UUID searched for, and not stored, is the first item of the
+    # listing (on pages of more than one item): the first page holds one row
+    # less and skip counts it
+    assigned = lookup_assigned(search.strip()) if search and not cursor and limit > 1 else None
+    if assigned is not None and (
+        (attribute_type and assigned.attribute_type != attribute_type) or
+        (not attribute_type and not show_all and assigned.attribute_type != "service") or
+        await attribute_stored(db, assigned.uuid)
+    ):
+        assigned = None
+    offset, page_size = skip, limit
+    if assigned is not None:
+        offset, page_size = max(skip - 1, 0), limit - (skip == 0)
     
-    if search:
+    fts_query = build_fts_query(search) if search and fts_enabled else None
+    if fts_query:
+        # Ranked full-text match; bm25() is lower for better matches
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        matches = text(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=fts_query).columns(rowid=Integer, rank=Float).subquery()
+        rank = matches.c.rank
+        query = query.join(matches, BLEAttribute.id == matches.c.rowid).add_columns(rank)
+        query = query.order_by(rank, BLEAttribute.id)
+    elif search:
         search = f"%{search}%"
-        query = query.filter(
+        query = query.where(
             (BLEAttribute.uuid.ilike(search)) |
             (BLEAttribute.vendor.ilike(search)) |
             (BLEAttribute.model.ilike(search)) |
@@ -160,55 +1072,394 @@ async def read_attributes(
         )
     
     if attribute_type:
-        query = query.filter(BLEAttribute.attribute_type == attribute_type)
+        query = query.where(BLEAttribute.attribute_type == attribute_type)
     elif not show_all:
-        query = query.filter(BLEAttribute.service_uuid == None)
+        query = query.where(BLEAttribute.service_uuid == None)
+    
+    if rank is None:
+        query = query.order_by(BLEAttribute.id)
+    
+    # Keyset pagination seeks straight to the cursor through the index, so every
+    # page costs the same; skip/limit is kept for existing clients
+    if cursor:
+        position = decode_cursor(cursor, ranked=rank is not None)
+        if rank is not None:
+            # bm25 statistics change as rows are written, shifting every rank:
+            # seek from the cursor row's current rank, and from the one in the
+            # cursor only if that row no longer matches
+            cursor_rank = func.coalesce(
+                select(matches.c.rank).where(matches.c.rowid == position["id"]).scalar_subquery(),
+                position["rank"]
+            )
+            query = query.where(or_(
+                rank > cursor_rank,
+                and_(rank == cursor_rank, BLEAttribute.id > position["id"])
+            ))
+        else:
+            query = query.where(BLEAttribute.id > position["id"])
+    else:
+        query = query.offset(offset)
     
-    return query.offset(skip).limit(limit).all()
+    result = await db.execute(query.limit(page_size))
+    rows = result.all()
+    
+    next_cursor = None
+    if rows and len(rows) == page_size:
+        position = {"id": rows[-1][0]}
+        if rank is not None:
+            position["rank"] = rows[-1][-1]
+        next_cursor = encode_cursor(position)
+    items = await render_attributes(db, rows, fields)
+    if assigned is not None and not skip:
+        items.insert(0, assigned_attribute(assigned, fields))
+    return orjson.dumps(items), next_cursor
 
-@app.get("/attributes/{uuid}", response_model=BLEAttributeNestedResponse)
-async def read_attribute(uuid: str, db: SessionLocal = Depends(get_db)):
-    attribute = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).first()
-    if attribute is None:
+@router.get("/attributes/", response_model=List[BLEAttributeNestedResponse])
+async def read_attributes(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    search: str | None = None,
+    attribute_type: BLEAttributeType | None = None,
+    show_all: bool = True,
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    fields = parse_fields(fields)
+    # Parameters that do not affect the result are left out of the key
+    cache_key = (
+        "attributes",
+        fields,
+        None if cursor else skip,
+        limit,
+        cursor,
+        search,
+        attribute_type,
+        None if attribute_type else show_all
+    )
+    return await versioned_json(
+        db, cache_key, if_none_match,
+        lambda: render_attribute_page(db, fields, skip, limit, cursor, search, attribute_type, show_all)
+    )
+
+# Declared before /attributes/{uuid}, which would otherwise match "fuzzy".
+# Server-Timing reports the time spent in the index.
+@router.get("/attributes/fuzzy", response_model=List[BLEAttributeFuzzyResponse])
+async def fuzzy_search_attributes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    min_score: float = Query(0.3, ge=0.0, le=1.0),
+    db: AsyncSession = Depends(get_write_db)
+):
+    index = await get_fuzzy_index(db)
+    # A complete UUID (short or long form) always finds its own row
+    exact = None
+    if is_uuid(q):
+        result = await db.execute(select(BLEAttribute.id).where(BLEAttribute.uuid_key == uuid_key(q)))
+        exact = result.scalar()
+    async with fuzzy_lock:
+        start = time.perf_counter()
+        matches = index.search(q, limit, min_score, exact)
+        elapsed = time.perf_counter() - start
+
+    items = []
+    if matches:
+        result = await db.execute(
+            select(*attribute_columns(ATTRIBUTE_FIELDS))
+            .where(BLEAttribute.id.in_([doc_id for _, doc_id in matches]))
+        )
+        rows = {row[0]: row for row in result}
+        # Rows missing here were deleted after the index read them
+        async with fuzzy_lock:
+            for _, doc_id in matches:
+                if doc_id not in rows:
+                    index.remove(doc_id)
+        found = [(score, rows[doc_id]) for score, doc_id in matches if doc_id in rows]
+        rendered = await render_attributes(db, [row for _, row in found], ATTRIBUTE_FIELDS)
+        for (score, _), item in zip(found, rendered):
+            item["score"] = round(score, 4)
+            items.append(item)
+    # A standard UUID leads the results unless it is stored (then its row does)
+    assigned = lookup_assigned(q.strip())
+    if assigned is not None:
+        key = uuid_key(assigned.uuid)
+        if not any(uuid_key(item["uuid"]) == key for item in items) and not await attribute_stored(db, assigned.uuid):
+            items = [{**assigned_attribute(assigned, ATTRIBUTE_FIELDS), "score": 1.0}, *items[:limit - 1]]
+    return Response(
+        content=orjson.dumps(items),
+        media_type="application/json",
+        headers={"Server-Timing": f"fuzzy;dur={elapsed * 1000:.3f}"}
+    )
+
+@router.get("/attributes/{uuid}", response_model=BLEAttributeNestedResponse)
+async def read_attribute(
+    uuid: str,
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    fields = parse_fields(fields)
+    key = uuid_key(uuid)
+    # Only the full representation is cached; invalidation is per UUID
+    cache_key = ("attribute", key) if fields == NESTED_FIELDS else None
+    generation = response_cache.generation
+    result = await db.execute(select(BLEAttribute.version).where(BLEAttribute.uuid_key == key))
+    version = result.scalar_one_or_none()
+    if version is None:
+        assigned = lookup_assigned(uuid)
+        if assigned is None:
+            raise HTTPException(status_code=404, detail="Attribute not found")
+        etag = f'"sig-{ASSIGNED_NUMBERS_VERSION}-{assigned.uuid}"'
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return cached_json(orjson.dumps(assigned_attribute(assigned, fields)), "HIT", etag)
+    etag = f'"{key.hex()}-{version}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cached = response_cache.get(cache_key, version) if cache_key else None
+    if cached is not None:
+        return cached_json(cached[1], "HIT", etag)
+
+    result = await db.execute(select(*attribute_columns(fields)).where(BLEAttribute.uuid_key == key))
+    rows = result.all()
+    if not rows:
         raise HTTPException(status_code=404, detail="Attribute not found")
-    return attribute
+    body = orjson.dumps((await render_attributes(db, rows, fields))[0])
+    if cache_key:
+        response_cache.put(cache_key, (version, body), generation)
+    return cached_json(body, "MISS", etag)
+
+# Full GATT tree (service -> characteristics -> descriptors, any depth) from one
+# recursive CTE over service_uuid, assembled in memory. UNION rather than UNION
+# ALL, so reference cycles terminate. Trees are cached like listings, one
+# entry per vendor/model filter or root.
+async def render_tree(db: AsyncSession, root_key: bytes | None, vendor: str | None, model: str | None):
+    columns = [getattr(BLEAttribute, field) for field in ATTRIBUTE_FIELDS]
+    anchor = select(*columns, literal(True).label("is_root"))
+    if root_key is not None:
+        anchor = anchor.where(BLEAttribute.uuid_key == root_key)
+    else:
+        anchor = anchor.where(BLEAttribute.attribute_type == BLEAttributeType.SERVICE)
+        if vendor:
+            anchor = anchor.where(BLEAttribute.vendor == vendor)
+        if model:
+            anchor = anchor.where(BLEAttribute.model == model)
+    tree = anchor.cte("gatt_tree", recursive=True)
+    tree = tree.union(
+        select(*columns, literal(False)).join(tree, BLEAttribute.service_uuid == tree.c.uuid)
+    )
+    result = await db.execute(select(tree).order_by(tree.c.id))
+
+    nodes = {}
+    roots = {}
+    for *values, is_root in result:
+        node = dict(zip(ATTRIBUTE_FIELDS, values))
+        node = nodes.setdefault(node["uuid"], node)
+        node.setdefault("children", [])
+        if is_root:
+            roots[node["uuid"]] = node
+    # Every row has one service_uuid, so below the roots this is a tree
+    for uuid, node in nodes.items():
+        parent = nodes.get(node["service_uuid"])
+        if parent is not None and uuid not in roots:
+            parent["children"].append(node)
+
+    if root_key is not None:
+        if not roots:
+            raise HTTPException(status_code=404, detail="Attribute not found")
+        return orjson.dumps(next(iter(roots.values()))), None
+    return orjson.dumps(list(roots.values())), None
+
+@router.get("/tree", response_model=List[BLEAttributeTreeResponse])
+async def read_tree(
+    vendor: str | None = None,
+    model: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    return await versioned_json(
+        db, ("tree", vendor, model), if_none_match, lambda: render_tree(db, None, vendor, model)
+    )
+
+@router.get("/tree/{service_uuid}", response_model=BLEAttributeTreeResponse)
+async def read_service_tree(
+    service_uuid: str,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    root_key = uuid_key(service_uuid)
+    return await versioned_json(
+        db, ("tree", root_key), if_none_match, lambda: render_tree(db, root_key, None, None)
+    )
 
-@app.get("/")
+# Company identifiers (as in manufacturer-specific advertising data), decimal
+# or 0x-prefixed hex
+@router.get("/companies/{company_id}")
+async def read_company(company_id: str):
+    try:
+        number = int(company_id, 16) if company_id.lower().startswith("0x") else int(company_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Company ID must be decimal or 0x-prefixed hex")
+    name = company_name(number)
+    if name is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {"id": number, "hex": f"0x{number:04X}", "name": name}
+
+@router.get("/")
 async def read_root():
     return FileResponse('index.html')
 
-@app.post("/upload-log/")
-async def upload_log(file: UploadFile = File(...)):
-    content = await file.read()
-    # Here you would process the log file
-    # This is a placeholder - you'll need to implement the actual log parsing logic
+@router.post("/upload-log/")
+async def upload_log(
+    file: UploadFile = File(...),
+    vendor: str = Form("Unknown"),
+    model: str = Form("Unknown"),
+    description: str | None = Form(None),
+    dialect: str = Form(DEFAULT_DIALECT),
+    force: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    # The upload is read in fixed-size chunks, hashed in a first pass and then
+    # parsed line by line, so memory does not grow with the size of the capture
+    parser = make_parser(vendor, model, description, dialect)
+    digest = log_digest(vendor, model, description, dialect)
+    async for chunk in read_chunks(file):
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    imported = None if force else await find_imported(db, digest)
+    if imported is not None:
+        await db.commit()
+        return {**duplicate_result(imported), "lines_parsed": 0, "created": 0, "updated": 0}
+
+    await file.seek(0)
     try:
-        text_content = content.decode()
-        # Process the log content here
-        return {"message": "Log file processed successfully"}
+        created, updated = await ingest_log(db, iter_lines(read_chunks(file)), parser)
+        await record_import(db, digest, file.filename, vendor, model, dialect, parser.lines, created + updated)
+        await db.commit()
     except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error processing log: {str(e)}")
+    return {
+        "message": "Log file processed successfully",
+        "duplicate": False,
+        "digest": digest,
+        "lines_parsed": parser.lines,
+        "created": created,
+        "updated": updated
+    }
 
-@app.patch("/attributes/{uuid}", response_model=BLEAttributeResponse)
-async def update_attribute(uuid: str, update: dict, db: SessionLocal = Depends(get_db)):
-    attribute = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).first()
-    if attribute is None:
-        raise HTTPException(status_code=404, detail="Attribute not found")
-    
-    for key, value in update.items():
-        setattr(attribute, key, value)
-    
+def update_values(changes: BLEAttributeUpdate) -> dict:
+    values = changes.dict(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if "uuid" in values:
+        values["uuid_key"] = uuid_key(values["uuid"])
+    return values
+
+# The checks create_attribute makes, for the attributes matching `where` as
+# they will be after `values`: a new service_uuid must name a stored service
+# (and is rewritten to its stored spelling), and characteristics and
+# descriptors cannot be left without one.
+async def check_parents(db: AsyncSession, where, values: dict):
+    if values.get("service_uuid") is not None:
+        result = await db.execute(
+            select(BLEAttribute.uuid).where(
+                BLEAttribute.uuid_key == uuid_key(values["service_uuid"]),
+                BLEAttribute.attribute_type == BLEAttributeType.SERVICE
+            )
+        )
+        service_uuid = result.scalar()
+        if service_uuid is None:
+            raise HTTPException(status_code=400, detail="Referenced service not found")
+        values["service_uuid"] = service_uuid
+        return
+    if "service_uuid" in values:
+        if values.get("attribute_type") == BLEAttributeType.SERVICE:
+            return
+        orphaned = true() if "attribute_type" in values else BLEAttribute.attribute_type != BLEAttributeType.SERVICE
+    elif values.get("attribute_type", BLEAttributeType.SERVICE) != BLEAttributeType.SERVICE:
+        orphaned = BLEAttribute.service_uuid.is_(None)
+    else:
+        return
+    result = await db.execute(select(BLEAttribute.id).where(where, orphaned).limit(1))
+    if result.first() is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Characteristics and descriptors must be associated with a service"
+        )
+
+# Apply `values` to every attribute matching `where` in one UPDATE ... RETURNING
+# `columns` (as stored after the update), after check_parents(). Updated
+# attributes and their parents are marked stale; if the update moves attributes
+# (uuid or service_uuid), the parents they leave are read first, as their
+# nested responses change too.
+async def update_attributes(db: AsyncSession, where, values: dict, columns=()) -> list:
+    await check_parents(db, where, values)
+    stale = []
+    if "uuid" in values or "service_uuid" in values:
+        result = await db.execute(select(BLEAttribute.uuid, BLEAttribute.service_uuid).where(where))
+        stale.extend(uuid for row in result for uuid in row)
+    result = await db.execute(
+        update(BLEAttribute)
+        .where(where)
+        .values(**values)
+        .returning(*columns, BLEAttribute.uuid, BLEAttribute.service_uuid)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    mark_stale(db, stale + [uuid for row in rows for uuid in row[-2:]])
+    return rows
+
+@router.patch("/attributes/{uuid}", response_model=BLEAttributeResponse)
+async def update_attribute(uuid: str, changes: BLEAttributePatch, db: AsyncSession = Depends(get_db)):
+    values = update_values(changes)
+    columns = attribute_columns(ATTRIBUTE_FIELDS)
     try:
-        db.commit()
-        db.refresh(attribute)
+        rows = await update_attributes(db, BLEAttribute.uuid_key == uuid_key(uuid), values, columns)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Attribute not found")
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Update failed")
-    return attribute
+    return (await render_attributes(db, rows, ATTRIBUTE_FIELDS))[0]
 
-@app.delete("/attributes/{uuid}")
-async def delete_attribute(uuid: str, db: SessionLocal = Depends(get_db)):
-    attribute = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).first()
+# Batch update: the same changes for the listed UUIDs, for every attribute of
+# a vendor and/or model, or for the listed UUIDs within that vendor/model.
+# One UPDATE per UPSERT_BATCH_SIZE UUIDs (one in all for a filter), in a
+# single transaction.
+@router.patch("/attributes/")
+async def update_attributes_batch(
+    batch: BLEAttributeBatchUpdate,
+    vendor: str | None = None,
+    model: str | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+    values = update_values(batch.changes)
+    if batch.uuids is None:
+        filters = [attribute_filter(vendor, model)]
+    else:
+        keys = list(dict.fromkeys(uuid_key(uuid) for uuid in batch.uuids))
+        scope = attribute_filter(vendor, model) if vendor or model else None
+        filters = []
+        for i in range(0, len(keys), UPSERT_BATCH_SIZE):
+            where = BLEAttribute.uuid_key.in_(keys[i:i + UPSERT_BATCH_SIZE])
+            filters.append(where if scope is None else and_(where, scope))
+    updated = []
+    try:
+        for where in filters:
+            rows = await update_attributes(db, where, values)
+            updated.extend(row[0] for row in rows)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Update failed")
+    return {"message": f"Updated {len(updated)} attributes", "updated": len(updated), "uuids": updated}
+
+@router.delete("/attributes/{uuid}")
+async def delete_attribute(uuid: str, db: AsyncSession = Depends(get_db)):
+    attribute = await get_attribute(db, uuid)
     if attribute is None:
         raise HTTPException(status_code=404, detail="Attribute not found")
     
@@ -220,85 +1471,451 @@ async def delete_attribute(uuid: str, db: SessionLocal = Depends(get_db)):
             detail=f"Service has {char_count} characteristic(s). Use force_delete=true to delete the service and all its characteristics."
         )
     
-    db.delete(attribute)
+    await db.delete(attribute)
+    mark_stale(db, [attribute.uuid, attribute.service_uuid])
     try:
-        db.commit()
+        await db.commit()
         return {"message": "Attribute deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.delete("/attributes/{uuid}/force")
-async def force_delete_attribute(uuid: str, db: SessionLocal = Depends(get_db)):
-    logger.info(f"Attempting force delete of attribute {uuid}")
+# Set-based deletes. subtree() is a recursive CTE over service_uuid from the
+# rows matching `roots` down to any depth (UNION, so cycles terminate); the
+# whole subtree is removed or detached with one statement each, and the routes
+# commit once.
+def subtree(roots) -> select:
+    tree = select(BLEAttribute.id, BLEAttribute.uuid).where(roots).cte("subtree", recursive=True)
+    return tree.union(
+        select(BLEAttribute.id, BLEAttribute.uuid).join(tree, BLEAttribute.service_uuid == tree.c.uuid)
+    )
+
+async def delete_subtrees(db: AsyncSession, roots) -> int:
+    tree = subtree(roots)
+    result = await db.execute(
+        delete(BLEAttribute)
+        .where(BLEAttribute.id.in_(select(tree.c.id)))
+        .returning(BLEAttribute.uuid, BLEAttribute.service_uuid)
+    )
+    rows = result.all()
+    mark_stale(db, [uuid for row in rows for uuid in row])
+    return len(rows)
+
+# Deletes the matching rows and detaches their direct children, which keep
+# their own descendants
+async def orphan_subtrees(db: AsyncSession, roots) -> tuple[int, int]:
+    root_rows = select(BLEAttribute.id, BLEAttribute.uuid).where(roots).cte("roots")
+    result = await db.execute(
+        update(BLEAttribute)
+        .where(
+            BLEAttribute.service_uuid.in_(select(root_rows.c.uuid)),
+            BLEAttribute.id.not_in(select(root_rows.c.id))
+        )
+        .values(service_uuid=None)
+        .returning(BLEAttribute.uuid)
+    )
+    orphaned = result.scalars().all()
+    result = await db.execute(
+        delete(BLEAttribute).where(roots).returning(BLEAttribute.uuid, BLEAttribute.service_uuid)
+    )
+    deleted = result.all()
+    mark_stale(db, orphaned + [uuid for row in deleted for uuid in row])
+    return len(deleted), len(orphaned)
+
+def attribute_filter(vendor: str | None, model: str | None):
+    clauses = []
+    if vendor:
+        clauses.append(BLEAttribute.vendor == vendor)
+    if model:
+        clauses.append(BLEAttribute.model == model)
+    if not clauses:
+        raise HTTPException(status_code=400, detail="vendor or model is required")
+    return and_(*clauses)
+
+@router.delete("/attributes/{uuid}/force")
+async def force_delete_attribute(uuid: str, db: AsyncSession = Depends(get_db)):
     try:
-        attribute = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).first()
-        logger.info(f"Found attribute: {attribute is not None}")
-        
-        if attribute is None:
-            logger.error(f"Attribute {uuid} not found")
+        deleted = await delete_subtrees(db, BLEAttribute.uuid_key == uuid_key(uuid))
+        if not deleted:
             raise HTTPException(status_code=404, detail="Attribute not found")
-        
-        logger.info(f"Attribute type: {attribute.attribute_type}")
-        logger.info(f"Children count: {len(attribute.children)}")
-        
-        # Get count of children before deletion
-        child_count = len(attribute.children)
-        logger.info(f"Found {child_count} children to delete")
-        
-        # Explicitly delete each child
-        for child in list(attribute.children):
-            logger.info(f"Deleting child {child.uuid}")
-            result = db.query(BLEAttribute).filter(BLEAttribute.uuid == child.uuid).delete()
-            logger.info(f"Delete result for child: {result}")
-        
-        # Delete the service
-        logger.info(f"Deleting service {uuid}")
-        result = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).delete()
-        logger.info(f"Delete result for service: {result}")
-        
-        db.commit()
-        logger.info("Deletion completed successfully")
-        return {"message": f"Deleted service and {child_count} characteristics"}
+        await db.commit()
+        return {"message": f"Deleted service and {deleted - 1} descendants"}
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        logger.error(f"Error during deletion: {str(e)}")
-        logger.exception(e)  # This will log the full stack trace
-        db.rollback()
+        logger.exception(f"Error deleting {uuid}")
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.delete("/attributes/{uuid}/orphan")
-async def orphan_delete_attribute(uuid: str, db: SessionLocal = Depends(get_db)):
-    logger.info(f"Attempting to orphan children of service {uuid}")
-    attribute = db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).first()
-    if attribute is None:
+@router.delete("/attributes/{uuid}/orphan")
+async def orphan_delete_attribute(uuid: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(BLEAttribute.attribute_type).where(BLEAttribute.uuid_key == uuid_key(uuid)))
+    attribute_type = result.scalar()
+    if attribute_type is None:
         raise HTTPException(status_code=404, detail="Attribute not found")
     
-    if attribute.attribute_type != BLEAttributeType.SERVICE:
+    if attribute_type != BLEAttributeType.SERVICE:
         raise HTTPException(status_code=400, detail="Can only orphan characteristics from services")
     
     try:
-        # Get count of children before orphaning
-        child_count = len(attribute.children)
-        logger.info(f"Found {child_count} children to orphan")
-        
-        # Explicitly update each child
-        for child in list(attribute.children):
-            logger.info(f"Orphaning child {child.uuid}")
-            db.query(BLEAttribute).filter(BLEAttribute.uuid == child.uuid).update(
-                {"service_uuid": None}
-            )
-        
-        # Delete the service
-        logger.info(f"Deleting service {uuid}")
-        db.query(BLEAttribute).filter(BLEAttribute.uuid == uuid).delete()
-        
-        db.commit()
-        logger.info("Orphaning completed successfully")
-        return {"message": f"Deleted service and orphaned {child_count} characteristics"}
+        _, orphaned = await orphan_subtrees(db, BLEAttribute.uuid_key == uuid_key(uuid))
+        await db.commit()
+        return {"message": f"Deleted service and orphaned {orphaned} characteristics"}
     except Exception as e:
         logger.error(f"Error during orphaning: {str(e)}")
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Bulk delete by vendor/model. Descendants of matching rows are deleted too
+# (or detached with orphan=true), whatever their own vendor.
+@router.delete("/attributes/")
+async def bulk_delete_attributes(
+    vendor: str | None = None,
+    model: str | None = None,
+    orphan: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    roots = attribute_filter(vendor, model)
+    try:
+        if orphan:
+            deleted, orphaned = await orphan_subtrees(db, roots)
+        else:
+            deleted, orphaned = await delete_subtrees(db, roots), 0
+        await db.commit()
+        return {"message": f"Deleted {deleted} attributes", "deleted": deleted, "orphaned": orphaned}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Bulk ingestion: one set-based existence check and one executemany
+# INSERT ... ON CONFLICT (uuid_key) per UPSERT_BATCH_SIZE rows. On conflict
+# (UpsertMode.MERGE) the stored row keeps its curated text
+# (vendor/model/description/comment/service), capability flags are OR-ed and a
+# newly reported sample_data replaces the old one. SKIP leaves existing rows
+# alone; REPLACE overwrites them (imports from an authoritative export).
+class UpsertMode(str, enum.Enum):
+    MERGE = "merge"
+    SKIP = "skip"
+    REPLACE = "replace"
+
+UPSERT_BATCH_SIZE = 500
+ATTRIBUTE_COLUMNS = (
+    "uuid", "vendor", "model", "description", "attribute_type", "service_uuid",
+    "sample_data", "can_read", "can_write", "can_indicate", "can_notify", "comment"
+)
+CAPABILITY_FLAGS = ("can_read", "can_write", "can_indicate", "can_notify")
+KEEP_EXISTING_COLUMNS = ("vendor", "model", "description", "service_uuid", "comment")
+
+def attribute_row(record: dict) -> dict:
+    row = {column: record.get(column) for column in ATTRIBUTE_COLUMNS}
+    for flag in CAPABILITY_FLAGS:
+        row[flag] = bool(row[flag])
+    row["uuid_key"] = uuid_key(row["uuid"])
+    return row
+
+# Collapse rows for the same UUID within one batch using the same rules as the
+# ON CONFLICT clause, so a statement never touches a row twice
+def merge_attribute_rows(records) -> dict:
+    rows = {}
+    for record in records:
+        row = attribute_row(record)
+        existing = rows.get(row["uuid_key"])
+        if existing is None:
+            rows[row["uuid_key"]] = row
+            continue
+        for column in KEEP_EXISTING_COLUMNS:
+            if existing[column] is None:
+                existing[column] = row[column]
+        for flag in CAPABILITY_FLAGS:
+            existing[flag] = existing[flag] or row[flag]
+        if row["sample_data"] is not None:
+            existing["sample_data"] = row["sample_data"]
+    return rows
+
+def upsert_statement(dialect_name: str, mode: UpsertMode):
+    table = BLEAttribute.__table__
+    # Imported here: loading the Postgres dialect costs ~30 ms at startup
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect_name}")
+    statement = insert(table)
+
+    if mode == UpsertMode.SKIP:
+        return statement.on_conflict_do_nothing(index_elements=[table.c.uuid_key])
+    excluded = statement.excluded
+    if mode == UpsertMode.REPLACE:
+        values = {column: excluded[column] for column in ATTRIBUTE_COLUMNS}
+        return statement.on_conflict_do_update(index_elements=[table.c.uuid_key], set_=values)
+    values = {column: func.coalesce(table.c[column], excluded[column]) for column in KEEP_EXISTING_COLUMNS}
+    values.update({flag: or_(table.c[flag], excluded[flag]) for flag in CAPABILITY_FLAGS})
+    values["sample_data"] = func.coalesce(excluded.sample_data, table.c.sample_data)
+    return statement.on_conflict_do_update(index_elements=[table.c.uuid_key], set_=values)
+
+# Insert or merge many attributes inside the caller's transaction.
+# Returns (created, existing) counts; existing rows are handled per mode.
+async def upsert_attributes(db: AsyncSession, records, mode: UpsertMode = UpsertMode.MERGE) -> tuple[int, int]:
+    rows = merge_attribute_rows(records)
+    if not rows:
+        return 0, 0
+
+    # Stored spellings of the rows and of the services they reference
+    parents = {uuid_key(row["service_uuid"]) for row in rows.values() if row["service_uuid"]}
+    keys = list(parents | rows.keys())
+    existing = {}
+    spellings = {}
+    for i in range(0, len(keys), UPSERT_BATCH_SIZE):
+        result = await db.execute(
+            select(BLEAttribute.uuid_key, BLEAttribute.uuid, BLEAttribute.service_uuid)
+            .where(BLEAttribute.uuid_key.in_(keys[i:i + UPSERT_BATCH_SIZE]))
+        )
+        for key, uuid, service_uuid in result:
+            spellings[key] = uuid
+            if key in rows:
+                existing[key] = service_uuid
+
+    # Children point at their service's spelling, which the children
+    # relationship and /tree join on: the stored one, or the one in this batch
+    # for new services (replace also rewrites stored spellings)
+    batch_spellings = {key: row["uuid"] for key, row in rows.items()}
+    if mode == UpsertMode.REPLACE:
+        spellings.update(batch_spellings)
+    else:
+        spellings = {**batch_spellings, **spellings}
+    for row in rows.values():
+        if row["service_uuid"]:
+            row["service_uuid"] = spellings.get(uuid_key(row["service_uuid"]), row["service_uuid"])
+
+    statement = upsert_statement(db.bind.dialect.name, mode)
+    values = list(rows.values())
+    # Existing rows keep their stored service, so that one goes stale too
+    mark_stale(db, [row["uuid"] for row in values] + [row["service_uuid"] for row in values] + list(existing.values()))
+    for i in range(0, len(values), UPSERT_BATCH_SIZE):
+        await db.execute(statement, values[i:i + UPSERT_BATCH_SIZE])
+    return len(rows) - len(existing), len(existing)
+
+async def read_bulk_items(request: Request) -> list:
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            items = [json.loads(line) async for line in iter_lines(request.stream()) if line.strip()]
+        else:
+            items = await request.json()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of attributes")
+    return items
+
+# Point the service_uuid of new attributes at their service's stored
+# spelling, resolving every referenced service in one query and allowing
+# services among `attributes`. A missing or unknown service is a 400 naming
+# the item (`label` and its position, counted from `first`).
+async def check_new_parents(db: AsyncSession, attributes: list, label: str = "Item", first: int = 0):
+    services = {
+        uuid_key(a.uuid): a.uuid for a in attributes if a.attribute_type == BLEAttributeType.SERVICE
+    }
+    referenced = {uuid_key(a.service_uuid) for a in attributes if a.service_uuid} - services.keys()
+    referenced = list(referenced)
+    for i in range(0, len(referenced), UPSERT_BATCH_SIZE):
+        result = await db.execute(
+            select(BLEAttribute.uuid_key, BLEAttribute.uuid).where(
+                BLEAttribute.uuid_key.in_(referenced[i:i + UPSERT_BATCH_SIZE]),
+                BLEAttribute.attribute_type == BLEAttributeType.SERVICE
+            )
+        )
+        services.update(result.tuples().all())
+
+    for index, attribute in enumerate(attributes, first):
+        if attribute.attribute_type != BLEAttributeType.SERVICE and not attribute.service_uuid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{label} {index}: characteristics and descriptors must be associated with a service"
+            )
+        if attribute.service_uuid:
+            service_uuid = services.get(uuid_key(attribute.service_uuid))
+            if service_uuid is None:
+                raise HTTPException(status_code=400, detail=f"{label} {index}: referenced service not found")
+            attribute.service_uuid = service_uuid
+
+@router.post("/attributes/bulk")
+async def create_attributes_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        attributes = [BLEAttributeCreate(**item) for item in await read_bulk_items(request)]
+    except (TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    await check_new_parents(db, attributes)
+
+    try:
+        created, updated = await upsert_attributes(db, [a.dict() for a in attributes])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"{created} attributes created, {updated} updated", "created": created, "updated": updated}
+
+# Full export and import. Rows are streamed through a server-side cursor
+# (yield_per) in EXPORT_BATCH_SIZE partitions, so memory does not grow with the
+# table. Every row carries the database version of its last write; the export
+# sends the current version as X-Database-Version, and passing it back as
+# updated_since returns only rows written since (deletions are not included).
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ATTRIBUTE_COLUMNS + ("version",)
+EXPORT_MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+async def export_partitions(updated_since: int | None):
+    query = (
+        select(*(getattr(BLEAttribute, column) for column in EXPORT_COLUMNS))
+        .order_by(BLEAttribute.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if updated_since is not None:
+        query = query.where(BLEAttribute.version > updated_since)
+    # The response outlives the request's session, so the stream has its own
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+async def encode_ndjson(partitions):
+    async for rows in partitions:
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in rows)
+
+async def encode_csv(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in partitions:
+        for row in rows:
+            writer.writerow(value.value if isinstance(value, enum.Enum) else value for value in row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+@router.get("/export")
+async def export_attributes(
+    format: ExportFormat = ExportFormat.NDJSON,
+    gzip: bool = False,
+    updated_since: int | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Read before streaming: rows written meanwhile are exported again next time
+    version = await database_version(db)
+    encode = encode_csv if format == ExportFormat.CSV else encode_ndjson
+    body = encode(export_partitions(updated_since))
+    filename = f"attributes.{format.value}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "X-Database-Version": str(version),
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+async def gunzip_stream(chunks):
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 32)
+    async for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+    if data := decompressor.flush():
+        yield data
+
+# CSV records can span lines (quoted newlines); a record is complete once its
+# quotes balance, since escaped quotes come in pairs
+async def iter_csv_records(lines):
+    header = None
+    pending = []
+    quotes = 0
+    async for line in lines:
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        values = next(csv.reader(["\n".join(pending)]), [])
+        pending = []
+        quotes = 0
+        if header is None:
+            header = values
+        elif values:
+            yield {column: value if value != "" else None for column, value in zip(header, values)}
+
+async def iter_ndjson_records(lines):
+    async for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+@router.post("/import")
+async def import_attributes(
+    request: Request,
+    format: ExportFormat | None = None,
+    mode: UpsertMode = UpsertMode.REPLACE,
+    db: AsyncSession = Depends(get_db)
+):
+    if format is None:
+        format = ExportFormat.CSV if "csv" in request.headers.get("content-type", "") else ExportFormat.NDJSON
+    chunks = request.stream()
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        chunks = gunzip_stream(chunks)
+    lines = iter_lines(chunks)
+    records = iter_csv_records(lines) if format == ExportFormat.CSV else iter_ndjson_records(lines)
+
+    created_count = 0
+    updated_count = 0
+    batch = []
+    index = 0
+
+    # Each batch is checked like /attributes/bulk and committed on its own, so
+    # the transaction (and the rows it marks stale) stays one batch long. A
+    # service must come before, or in the same batch as, its children.
+    async def write_batch():
+        nonlocal created_count, updated_count
+        await check_new_parents(db, batch, "Record", index - len(batch))
+        created, updated = await upsert_attributes(db, [attribute.dict() for attribute in batch], mode)
+        await db.commit()
+        created_count += created
+        updated_count += updated
+        batch.clear()
+
+    try:
+        async for record in records:
+            try:
+                batch.append(BLEAttributeCreate(**record))
+            except (TypeError, ValidationError) as e:
+                raise HTTPException(status_code=422, detail=f"Record {index}: {str(e)}")
+            index += 1
+            if len(batch) >= UPSERT_BATCH_SIZE:
+                await write_batch()
+        await write_batch()
+    except HTTPException:
+        await db.rollback()
+        raise
+    except (ValueError, zlib.error) as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid {format.value} input: {str(e)}")
+    return {
+        "message": "Import completed",
+        "records": index,
+        "created": created_count,
+        "updated": updated_count
+    }
 
 # Add this new model for log parsing
 class LogParseRequest(BaseModel):
@@ -306,161 +1923,500 @@ class LogParseRequest(BaseModel):
     vendor: str | None = None
     model: str | None = None
     description: str | None = None
+    dialect: str = DEFAULT_DIALECT
+    # Parse even if this log was imported before
+    force: bool = False
+
+# Log ingestion: rows are upserted in batches of LOG_BATCH_SIZE as the parser
+# produces them, inside the caller's transaction
+LOG_CHUNK_SIZE = 64 * 1024
+LOG_BATCH_SIZE = 500
+
+async def read_chunks(file: UploadFile):
+    while chunk := await file.read(LOG_CHUNK_SIZE):
+        yield chunk
+
+async def iter_text_lines(text: str):
+    for line in io.StringIO(text):
+        yield line.rstrip("\n")
+
+def check_dialect(dialect: str):
+    if dialect not in DIALECTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown log dialect '{dialect}'; expected one of: {', '.join(sorted(DIALECTS))}"
+        )
+
+def make_parser(vendor: str | None, model: str | None, description: str | None, dialect: str) -> LogParser:
+    check_dialect(dialect)
+    return LogParser(vendor, model, description, dialect)
+
+# Import ledger. A log is identified by a SHA-256 of the import parameters
+# (they change the rows written) followed by its bytes, hashed in a streaming
+# pass before anything is parsed. A log already in the ledger is not parsed
+# again unless force is set; the response reports the earlier import with
+# "duplicate": true. Placeholder UUIDs are derived from the log's content
+# (LogParser.placeholder_uuid), so a forced re-import updates the same rows.
+def log_digest(vendor: str | None, model: str | None, description: str | None, dialect: str):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([vendor, model, description, dialect]).encode() + b"\n")
+    return digest
+
+def file_digest(path: str, vendor: str | None, model: str | None, description: str | None, dialect: str) -> str:
+    digest = log_digest(vendor, model, description, dialect)
+    with open(path, "rb") as log_file:
+        while chunk := log_file.read(LOG_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# The ledger entry for `digest`, counted as submitted again; the caller commits
+async def find_imported(db: AsyncSession, digest: str) -> ImportedLog | None:
+    imported = await db.get(ImportedLog, digest)
+    if imported is not None:
+        imported.imports += 1
+        imported.last_seen_at = time.time()
+        log_duplicate_imports.inc((imported.dialect,))
+    return imported
+
+async def record_import(
+    db: AsyncSession,
+    digest: str,
+    filename: str | None,
+    vendor: str | None,
+    model: str | None,
+    dialect: str,
+    lines_parsed: int,
+    rows_written: int
+):
+    now = time.time()
+    imported = await db.get(ImportedLog, digest)
+    if imported is None:
+        imported = ImportedLog(
+            digest=digest, filename=filename, vendor=vendor, model=model, dialect=dialect, imports=0, created_at=now
+        )
+        db.add(imported)
+    imported.imports += 1
+    imported.lines_parsed = lines_parsed
+    imported.rows_written = rows_written
+    imported.last_seen_at = now
 
-@app.post("/parse-log/")
+def duplicate_result(imported: ImportedLog) -> dict:
+    return {
+        "message": "Log already imported",
+        "duplicate": True,
+        "digest": imported.digest,
+        "imported_at": imported.created_at
+    }
+
+# commit_batches commits every batch, so a long import only holds the writer
+# while a batch is written instead of for the whole log. checkpoint, if given,
+# is called with the running "rows_written" count before each of those commits,
+# and a batch is also cut every checkpoint_seconds, so the checkpoint keeps
+# being committed through stretches of a log without records.
+async def ingest_log(
+    db: AsyncSession,
+    lines,
+    parser: LogParser,
+    checkpoint: Callable[[int], None] | None = None,
+    commit_batches: bool = False,
+    checkpoint_seconds: float | None = None
+) -> tuple[int, int]:
+    start = time.perf_counter()
+    created_count = 0
+    updated_count = 0
+    due = time.monotonic() + checkpoint_seconds if checkpoint_seconds else None
+    async for line in lines:
+        parser.feed(line)
+        if parser.pending >= LOG_BATCH_SIZE or (due is not None and time.monotonic() >= due):
+            created, updated = await upsert_attributes(db, parser.drain())
+            created_count += created
+            updated_count += updated
+            if commit_batches:
+                if checkpoint is not None:
+                    checkpoint(created_count + updated_count)
+                await db.commit()
+                if due is not None:
+                    due = time.monotonic() + checkpoint_seconds
+                # Requests waiting for the writer get it before the next batch
+                await asyncio.sleep(0)
+    created, updated = await upsert_attributes(db, parser.drain())
+    created_count += created
+    updated_count += updated
+    if checkpoint is not None:
+        checkpoint(created_count + updated_count)
+    labels = (parser.dialect.name,)
+    log_lines_parsed.inc(labels, parser.lines)
+    log_records_parsed.inc(labels, created_count + updated_count)
+    log_parse_seconds.inc(labels, time.perf_counter() - start)
+    return created_count, updated_count
+
+@router.post("/parse-log/")
 async def parse_log(
     request: LogParseRequest,
-    db: SessionLocal = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    services = {}
-    characteristics = {}
-    current_service = None
-    
-    # Parse the log line by line
-    for line in request.log_text.split('\n'):
-        if "Discovered" in line and "Services" in line:
-            # Extract service UUIDs - handle multiple services in one line
-            service_part = line.split('Discovered ')[1].split(' Services')[0].strip()
-            # Split by comma and handle potential 'and' in the last item
-            if ',' in service_part:
-                service_items = service_part.split(',')
-                if ' and ' in service_items[-1]:
-                    last_items = service_items[-1].split(' and ')
-                    service_items = service_items[:-1] + last_items
-            else:
-                service_items = service_part.split(' and ')
-            
-            # Process each service
-            for service_item in service_items:
-                service_item = service_item.strip()
-                # If it's a UUID, use it directly, otherwise use it as description
-                if any(c in service_item for c in '0123456789ABCDEF-'):
-                    uuid = service_item
-                    description = f'Service {uuid}'
-                else:
-                    # For named services without UUID, generate a placeholder UUID
-                    uuid = str(generate_uuid())
-                    description = service_item
-                
-                services[uuid] = {
-                    'uuid': uuid,
-                    'vendor': request.vendor,
-                    'model': request.model,
-                    'description': description,
-                    'attribute_type': 'service',
-                    'comment': f'Automatically parsed from log: {request.description or "No description provided"}'
-                }
-                current_service = uuid
-        
-        elif "Discovered" in line and "Characteristics" in line:
-            # Extract characteristic UUIDs and names
-            char_part = line.split('Discovered ')[1].split(' Characteristics')[0]
-            
-            # Handle both comma-separated and 'and' separated lists
-            if ',' in char_part:
-                # Split by comma and handle potential 'and' in the last item
-                char_items = char_part.split(',')
-                if ' and ' in char_items[-1]:
-                    last_items = char_items[-1].split(' and ')
-                    char_items = char_items[:-1] + last_items
-            else:
-                # Handle simple 'and' separated items
-                char_items = char_part.split(' and ')
-            
-            # Clean up each characteristic
-            for char_item in char_items:
-                char_item = char_item.strip()
-                if any(c in char_item for c in '0123456789ABCDEF-'):
-                    char_uuid = char_item
-                    description = f'Characteristic {char_uuid}'
-                else:
-                    # Use the renamed uuid import
-                    char_uuid = str(generate_uuid())
-                    description = char_item
-                
-                characteristics[char_uuid] = {
-                    'uuid': char_uuid,
-                    'vendor': request.vendor,
-                    'model': request.model,
-                    'description': description,
-                    'service_uuid': current_service,
-                    'attribute_type': 'characteristic',
-                    'can_read': False,
-                    'can_write': False,
-                    'can_notify': False,
-                    'can_indicate': False,
-                    'comment': f'Automatically parsed from log: {request.description or "No description provided"}'
-                }
-        
-        # Parse characteristic properties
-        elif "Setting Boolean true for Notifying Characteristic" in line:
-            uuid = line.split('Characteristic ')[1].strip()
-            if uuid in characteristics:
-                characteristics[uuid]['can_notify'] = True
-                
-        elif "Writing value" in line and "to" in line:
-            uuid = line.split('to ')[1].split(' Characteristic')[0].strip()
-            if uuid in characteristics:
-                characteristics[uuid]['can_write'] = True
-                
-        elif "Updated Value of Characteristic" in line:
-            parts = line.split('Characteristic ')[1].split(' to ')
-            uuid = parts[0].strip()
-            sample_data = parts[1].strip()
-            if uuid in characteristics:
-                characteristics[uuid]['can_read'] = True
-                characteristics[uuid]['sample_data'] = sample_data
-
-    # Create/update database entries
-    created_items = []
+    parser = make_parser(request.vendor, request.model, request.description, request.dialect)
+    digest = log_digest(request.vendor, request.model, request.description, request.dialect)
+    digest.update(request.log_text.encode("utf-8"))
+    digest = digest.hexdigest()
+    imported = None if request.force else await find_imported(db, digest)
+    if imported is not None:
+        await db.commit()
+        return {**duplicate_result(imported), "created_items": []}
     try:
-        # First create services
-        for service_data in services.values():
-            service = BLEAttribute(**service_data)
-            db.add(service)
-            created_items.append(service_data)
-        
-        # Then create characteristics
-        for char_data in characteristics.values():
-            char = BLEAttribute(**char_data)
-            db.add(char)
-            created_items.append(char_data)
-            
-        db.commit()
+        created, updated = await ingest_log(db, iter_text_lines(request.log_text), parser)
+        await record_import(
+            db, digest, None, request.vendor, request.model, request.dialect, parser.lines, created + updated
+        )
+        await db.commit()
         
         return {
             "message": "Log parsed successfully",
-            "created_items": created_items
+            "duplicate": False,
+            "digest": digest,
+            "created_items": parser.records()
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/sample-data")
-async def create_sample_data(db: SessionLocal = Depends(get_db)):
-    sample_data = [
-        # Standard Bluetooth Services (16-bit UUIDs)
-        {
-            "uuid": "1800",
-            "vendor": "Bluetooth SIG",
-            "model": "Generic",
-            "description": "Generic Access",
-            "attribute_type": "service",
-            "comment": "Defines device name, appearance, and connection parameters"
-        },
-        {
-            "uuid": "2A00",
-            "vendor": "Bluetooth SIG",
-            "model": "Generic",
-            "description": "Device Name",
-            "attribute_type": "characteristic",
-            "service_uuid": "1800",
-            "can_read": True,
-            "can_write": True,
-            "sample_data": "Fitbit Charge 5",
-            "comment": "Human readable device name"
-        },
+# Batch log ingestion: files are parsed in parallel in worker processes (the
+# parser is CPU-bound and would otherwise hold the GIL on the event loop), then
+# their records are merged and written by the caller in one transaction.
+# Workers are started lazily with "spawn" so they do not inherit the event
+# loop or database connections. multiprocessing is only imported then.
+LOG_WORKERS = int(os.environ.get("LOG_WORKERS", os.cpu_count() or 1))
+log_pool: "ProcessPoolExecutor | None" = None
 
+def get_log_pool() -> "ProcessPoolExecutor":
+    global log_pool
+    if log_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        log_pool = ProcessPoolExecutor(max_workers=LOG_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return log_pool
+
+# Files are hashed first (in threads; hashlib releases the GIL), and files
+# already in the import ledger, or repeated in the batch, are skipped. `names`
+# (default: the paths) are recorded in the ledger.
+async def ingest_log_files(
+    db: AsyncSession,
+    paths: list[str],
+    vendor: str | None,
+    model: str | None,
+    description: str | None,
+    dialect: str,
+    force: bool = False,
+    names: list[str] | None = None
+) -> dict:
+    global log_pool
+    from concurrent.futures.process import BrokenProcessPool
+    start = time.perf_counter()
+    digests = await asyncio.gather(*(
+        asyncio.to_thread(file_digest, path, vendor, model, description, dialect) for path in paths
+    ))
+    pending = {}
+    for path, name, digest in zip(paths, names or paths, digests):
+        if digest in pending or (not force and await find_imported(db, digest) is not None):
+            continue
+        pending[digest] = (path, name)
+
+    loop = asyncio.get_running_loop()
+    pool = get_log_pool()
+    try:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, parse_log_file, path, vendor, model, description, dialect)
+            for path, _ in pending.values()
+        ))
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next batch
+        log_pool = None
+        raise
+    # Attributes seen in several files are merged (flags OR-ed, latest sample
+    # wins) before the single write
+    created, updated = await upsert_attributes(db, (record for _, records in results for record in records))
+    for (digest, (_, name)), (lines, records) in zip(pending.items(), results):
+        await record_import(db, digest, name, vendor, model, dialect, lines, len(records))
+    lines_parsed = sum(lines for lines, _ in results)
+    log_lines_parsed.inc((dialect,), lines_parsed)
+    log_records_parsed.inc((dialect,), created + updated)
+    log_parse_seconds.inc((dialect,), time.perf_counter() - start)
+    return {
+        "files": len(paths),
+        "skipped": len(paths) - len(pending),
+        "lines_parsed": lines_parsed,
+        "created": created,
+        "updated": updated
+    }
+
+@router.post("/upload-logs/")
+async def upload_logs(
+    files: List[UploadFile] = File(...),
+    vendor: str = Form("Unknown"),
+    model: str = Form("Unknown"),
+    description: str | None = Form(None),
+    dialect: str = Form(DEFAULT_DIALECT),
+    force: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    check_dialect(dialect)
+    with tempfile.TemporaryDirectory(prefix="upload-logs-") as tmpdir:
+        paths = []
+        for index, file in enumerate(files):
+            path = os.path.join(tmpdir, f"{index}.log")
+            with open(path, "wb") as out:
+                async for chunk in read_chunks(file):
+                    await asyncio.to_thread(out.write, chunk)
+            paths.append(path)
+        try:
+            result = await ingest_log_files(
+                db, paths, vendor, model, description, dialect, force, [file.filename for file in files]
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=f"Error processing logs: {str(e)}")
+    return {"message": "Log files processed successfully", **result}
+
+# Background import jobs
+#
+# /jobs/upload-log and /jobs/parse-log spool the log to JOB_DIR, record a job
+# row and return its id immediately. JOB_WORKERS tasks take job ids off an
+# in-process queue and run the same streaming ingestion as /upload-log/,
+# committing every LOG_BATCH_SIZE records so that other writes (including the
+# next job's submission) are not blocked for the length of an import.
+#
+# A worker claims a job with one conditional UPDATE (queued -> running, owner
+# and heartbeat set), so of several processes sharing the database only one
+# runs it. lines_parsed, rows_written and the heartbeat are written with every
+# committed batch, at least every JOB_HEARTBEAT_SECONDS. Queued jobs are
+# queued again on startup; a running job is queued again (on startup, and by
+# every process's job_reaper) only once its heartbeat is JOB_STALE_SECONDS old,
+# i.e. its worker died. It then parses its log from the start; the upserts are
+# idempotent (placeholder UUIDs are content-derived), so batches committed
+# before are simply merged again. A failed job keeps the batches it committed.
+# SQLite allows one writer, so the default is one worker.
+JOB_DIR = os.environ.get("JOB_DIR", "./import_jobs")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 10))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", 60))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid_lib.uuid4().hex[:8]}"
+job_queue: asyncio.Queue | None = None
+job_tasks: list[asyncio.Task] = []
+
+async def read_file_chunks(path: str):
+    with open(path, "rb") as log_file:
+        while chunk := await asyncio.to_thread(log_file.read, LOG_CHUNK_SIZE):
+            yield chunk
+
+def remove_spooled_log(path: str | None):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+async def run_job(job_id: str):
+    async with SessionLocal() as db:
+        now = time.time()
+        job = (await db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == JobStatus.QUEUED)
+            .values(status=JobStatus.RUNNING, owner=WORKER_ID, heartbeat=now, updated_at=now)
+            .returning(ImportJob)
+        )).scalar_one_or_none()
+        await db.commit()
+        if job is None:
+            # Gone, or claimed by another worker
+            return
+
+        parser = LogParser(job.vendor, job.model, job.description, job.dialect)
+        rows_written = 0
+
+        def checkpoint(count: int):
+            nonlocal rows_written
+            rows_written = count
+            job.lines_parsed = parser.lines
+            job.rows_written = rows_written
+            job.heartbeat = job.updated_at = time.time()
+
+        try:
+            created, updated = await ingest_log(
+                db, iter_lines(read_file_chunks(job.path)), parser, checkpoint,
+                commit_batches=True, checkpoint_seconds=JOB_HEARTBEAT_SECONDS
+            )
+            if job.digest:
+                await record_import(
+                    db, job.digest, job.filename, job.vendor, job.model, job.dialect, parser.lines, created + updated
+                )
+            job.status = JobStatus.SUCCEEDED
+            job.result = json.dumps({
+                "message": "Log file processed successfully",
+                "lines_parsed": parser.lines,
+                "created": created,
+                "updated": updated
+            })
+        except Exception as e:
+            logger.exception(f"Import job {job_id} failed")
+            await db.rollback()
+            job = await db.get(ImportJob, job_id)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        job.lines_parsed = parser.lines
+        job.rows_written = rows_written
+        job.heartbeat = job.updated_at = time.time()
+        await db.commit()
+        remove_spooled_log(job.path)
+
+async def job_worker():
+    while True:
+        job_id = await job_queue.get()
+        try:
+            await run_job(job_id)
+        except Exception:
+            logger.exception(f"Import job {job_id} could not be run")
+        finally:
+            job_queue.task_done()
+
+# Queue again the running jobs whose worker stopped sending heartbeats
+async def requeue_stale_jobs() -> list[str]:
+    async with SessionLocal() as db:
+        stale = (await db.execute(
+            update(ImportJob)
+            .where(
+                ImportJob.status == JobStatus.RUNNING,
+                or_(ImportJob.heartbeat.is_(None), ImportJob.heartbeat < time.time() - JOB_STALE_SECONDS)
+            )
+            .values(status=JobStatus.QUEUED, owner=None, updated_at=time.time())
+            .returning(ImportJob.id)
+        )).scalars().all()
+        await db.commit()
+    for job_id in stale:
+        logger.warning(f"Import job {job_id} lost its worker, queued again")
+    return stale
+
+async def job_reaper():
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            for job_id in await requeue_stale_jobs():
+                job_queue.put_nowait(job_id)
+        except Exception:
+            logger.exception("Stale import jobs could not be requeued")
+
+async def start_job_workers():
+    global job_queue
+    os.makedirs(JOB_DIR, exist_ok=True)
+    job_queue = asyncio.Queue()
+    await requeue_stale_jobs()
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(ImportJob.id)
+            .where(ImportJob.status == JobStatus.QUEUED)
+            .order_by(ImportJob.created_at)
+        )
+        for job_id in result.scalars():
+            job_queue.put_nowait(job_id)
+    job_tasks.extend(asyncio.create_task(job_worker()) for _ in range(JOB_WORKERS))
+    job_tasks.append(asyncio.create_task(job_reaper()))
+
+async def stop_job_workers():
+    for task in job_tasks:
+        task.cancel()
+    await asyncio.gather(*job_tasks, return_exceptions=True)
+    job_tasks.clear()
+
+async def submit_job(
+    db: AsyncSession,
+    chunks,
+    filename: str | None,
+    vendor: str | None,
+    model: str | None,
+    description: str | None,
+    dialect: str,
+    force: bool = False
+) -> dict:
+    check_dialect(dialect)
+    job_id = uuid_lib.uuid4().hex
+    path = os.path.join(JOB_DIR, f"{job_id}.log")
+    digest = log_digest(vendor, model, description, dialect)
+    with open(path, "wb") as out:
+        async for chunk in chunks:
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    digest = digest.hexdigest()
+    imported = None if force else await find_imported(db, digest)
+    now = time.time()
+    job = ImportJob(
+        id=job_id,
+        status=JobStatus.QUEUED,
+        filename=filename,
+        path=path,
+        vendor=vendor,
+        model=model,
+        description=description,
+        dialect=dialect,
+        created_at=now,
+        updated_at=now,
+        digest=digest
+    )
+    if imported is not None:
+        # Already imported: the job is done without being queued
+        remove_spooled_log(path)
+        job.path = None
+        job.status = JobStatus.SUCCEEDED
+        job.result = json.dumps({**duplicate_result(imported), "lines_parsed": 0, "created": 0, "updated": 0})
+    db.add(job)
+    await db.commit()
+    if imported is None:
+        job_queue.put_nowait(job_id)
+    return job_state(job)
+
+def job_state(job: ImportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "vendor": job.vendor,
+        "model": job.model,
+        "dialect": job.dialect,
+        "lines_parsed": job.lines_parsed,
+        "rows_written": job.rows_written,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
+
+async def encode_text(text: str):
+    yield text.encode("utf-8")
+
+@router.post("/jobs/upload-log", status_code=202)
+async def submit_upload_log_job(
+    file: UploadFile = File(...),
+    vendor: str = Form("Unknown"),
+    model: str = Form("Unknown"),
+    description: str | None = Form(None),
+    dialect: str = Form(DEFAULT_DIALECT),
+    force: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    return await submit_job(db, read_chunks(file), file.filename, vendor, model, description, dialect, force)
+
+@router.post("/jobs/parse-log", status_code=202)
+async def submit_parse_log_job(request: LogParseRequest, db: AsyncSession = Depends(get_db)):
+    return await submit_job(
+        db, encode_text(request.log_text), None, request.vendor, request.model, request.description,
+        request.dialect, request.force
+    )
+
+@router.get("/jobs/{job_id}")
+async def read_job(job_id: str, db: AsyncSession = Depends(get_write_db)):
+    job = await db.get(ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_state(job)
+
+def sample_attributes() -> list[dict]:
+    # Standard attributes (1800, 2A00, ...) come from the assigned-numbers table
+    sample_data = [
         # Apple Device (128-bit UUIDs)
         {
             "uuid": "9FA480E0-4967-4542-9390-D343DC5D04AE",
@@ -640,52 +2596,81 @@ async def create_sample_data(db: SessionLocal = Depends(get_db)):
                 }
             ])
 
-    created_count = 0
-    skipped_count = 0
+    return sample_data
+
+@router.post("/sample-data")
+async def create_sample_data(db: AsyncSession = Depends(get_db)):
+    sample_data = sample_attributes()
     try:
-        # First create services
-        for item in sample_data:
-            # Check if item already exists
-            existing = db.query(BLEAttribute).filter(BLEAttribute.uuid == item["uuid"]).first()
-            if not existing:
-                if item["attribute_type"] == "service":
-                    db_item = BLEAttribute(**item)
-                    db.add(db_item)
-                    created_count += 1
-            else:
-                skipped_count += 1
-        db.commit()
-
-        # Then create characteristics
-        for item in sample_data:
-            existing = db.query(BLEAttribute).filter(BLEAttribute.uuid == item["uuid"]).first()
-            if not existing:
-                if item["attribute_type"] == "characteristic":
-                    db_item = BLEAttribute(**item)
-                    db.add(db_item)
-                    created_count += 1
-            else:
-                skipped_count += 1
-        db.commit()
+        # Existing rows (possibly edited since) are left as they are
+        created_count, skipped_count = await upsert_attributes(db, sample_data, UpsertMode.SKIP)
+        await db.commit()
 
         return {
             "message": f"Sample data processed: {created_count} items created, {skipped_count} items skipped"
         }
     except Exception as e:
         logger.error(f"Error creating sample data: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/clear-sample-data")
-async def clear_sample_data(db: SessionLocal = Depends(get_db)):
+@router.post("/clear-sample-data")
+async def clear_sample_data(db: AsyncSession = Depends(get_db)):
     try:
-        # Delete all attributes where vendor is "Bluetooth SIG" or "Custom Vendor"
-        db.query(BLEAttribute).filter(
-            (BLEAttribute.vendor == "Bluetooth SIG") | 
-            (BLEAttribute.vendor == "Custom Vendor")
-        ).delete()
-        db.commit()
-        return {"message": "Sample data cleared successfully"}
+        # Only the sample rows themselves (by UUID, still under the sample's
+        # vendor/model), with descendants: the vendor/model pairs name real
+        # products that community submissions document too
+        devices: dict[tuple, list[bytes]] = {}
+        for row in sample_attributes():
+            devices.setdefault((row["vendor"], row["model"]), []).append(uuid_key(row["uuid"]))
+        roots = [
+            and_(BLEAttribute.vendor == vendor, BLEAttribute.model == model, BLEAttribute.uuid_key.in_(keys))
+            for (vendor, model), keys in devices.items()
+        ]
+        # Older sample data also stored standard attributes as rows
+        roots.append(and_(BLEAttribute.vendor == "Bluetooth SIG", BLEAttribute.model == "Generic"))
+        deleted = await delete_subtrees(db, or_(*roots))
+        await db.commit()
+        return {"message": f"Sample data cleared successfully ({deleted} attributes deleted)"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+
+# Application factory. `uvicorn test:app` serves the module-level app, which is
+# only built on first access (so scripts and worker processes importing this
+# module skip it); `uvicorn --factory test:create_app` builds a fresh one.
+# Startup (schema check or migration, resuming queued jobs) and shutdown run
+# in the lifespan.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    await start_job_workers()
+    try:
+        yield
+    finally:
+        await close_db()
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Open UUID Project", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, replace with specific origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "X-Database-Version", "X-Profile-Id"],
+    )
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    if PROFILE_REQUESTS or PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(ProfilingMiddleware)
+    # The routes are shared as they are; include_router() would rebuild each one
+    app.router.routes.extend(router.routes)
+    return app
+
+def __getattr__(name: str):
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,205 @@
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration on import
+DATA_DIR = tempfile.mkdtemp(prefix="uuid-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR}/test.db"
+os.environ["JOB_DIR"] = os.path.join(DATA_DIR, "import_jobs")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+import test as api
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(api.create_app()) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def empty_database(client):
+    async def clear():
+        async with api.SessionLocal() as db:
+            for table in (api.BLEAttribute, api.ImportedLog, api.ImportJob):
+                await db.execute(delete(table))
+            await db.commit()
+        api.response_cache.clear()
+
+    client.portal.call(clear)
+
+
+def attribute(uuid: str, attribute_type: str = "service", service_uuid: str | None = None, **fields) -> dict:
+    return {
+        "uuid": uuid,
+        "vendor": "Acme",
+        "model": "Sensor",
+        "description": f"Attribute {uuid}",
+        "attribute_type": attribute_type,
+        "service_uuid": service_uuid,
+        **fields,
+    }
+
+
+def create(client, *attributes: dict):
+    response = client.post("/attributes/bulk", json=list(attributes))
+    assert response.status_code == 200, response.text
+
+
+def listed_uuids(response) -> list[str]:
+    assert response.status_code == 200, response.text
+    return [item["uuid"] for item in response.json()]
+
+
+def test_search_matches_inside_words(client):
+    create(
+        client,
+        attribute("FE01", vendor="Fitbit", description="Activity tracker"),
+        attribute("FE02", vendor="Garmin", description="Heart rate strap"),
+    )
+    assert listed_uuids(client.get("/attributes/", params={"search": "bit"})) == ["FE01"]
+    assert listed_uuids(client.get("/attributes/", params={"search": "art rat"})) == ["FE02"]
+    # Terms too short for a trigram still match as substrings
+    assert listed_uuids(client.get("/attributes/", params={"search": "tb"})) == ["FE01"]
+
+
+def test_search_cache_key_is_the_search_as_sent(client):
+    create(client, attribute("FE03", description="Ab cd"), attribute("FE04", description="Abcd"))
+    assert listed_uuids(client.get("/attributes/", params={"search": "b "})) == ["FE03"]
+    assert listed_uuids(client.get("/attributes/", params={"search": "B"})) == ["FE03", "FE04"]
+
+
+def walk_pages(client, params: dict, between_pages=None) -> list[str]:
+    seen = []
+    cursor = None
+    for page in range(100):
+        response = client.get("/attributes/", params={**params, **({"cursor": cursor} if cursor else {})})
+        seen += listed_uuids(response)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return seen
+        if between_pages is not None:
+            between_pages(page)
+    raise AssertionError("cursor never ended")
+
+
+def test_cursor_pages_have_no_duplicates_or_gaps_while_rows_are_added(client):
+    stored = [f"{i:04X}" for i in range(0xA000, 0xA019)]
+    create(client, *(attribute(uuid) for uuid in stored))
+    added = []
+
+    def add_row(page):
+        if page < 3:
+            added.append(f"{0xB000 + page:04X}")
+            create(client, attribute(added[-1]))
+
+    seen = walk_pages(client, {"limit": 10}, add_row)
+    assert len(seen) == len(set(seen))
+    assert seen[:len(stored)] == stored
+    assert set(seen) == set(stored + added)
+
+
+def test_ranked_cursor_pages_have_no_duplicates_or_gaps_while_rows_are_added(client):
+    # Descriptions of different lengths rank differently under bm25
+    stored = [f"{i:04X}" for i in range(0xA100, 0xA119)]
+    create(client, *(
+        attribute(uuid, description="Battery level" + " of the sensor" * (i % 5)) for i, uuid in enumerate(stored)
+    ))
+    create(client, *(attribute(f"{i:04X}", description="Heart rate") for i in range(0xA200, 0xA210)))
+
+    def add_rows(page):
+        if page < 3:
+            create(client, *(
+                attribute(f"{0xB100 + page * 10 + i:04X}", description="Heart rate, battery powered")
+                for i in range(10)
+            ))
+
+    seen = walk_pages(client, {"search": "battery", "limit": 7}, add_rows)
+    assert len(seen) == len(set(seen))
+    assert set(stored) <= set(seen)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", "eyJpZCI6ICJ4In0"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/attributes/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+    assert client.get("/attributes/", params={"cursor": cursor, "search": "battery"}).status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/attributes/180D", "/attributes/"])
+def test_etag_changes_after_a_patch(client, path):
+    create(client, attribute("180D"), attribute("2A37", "characteristic", "180D"))
+    first = client.get(path)
+    etag = first.headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+    # The service's nested response lists the characteristic, so it changes too
+    response = client.patch("/attributes/2A37", json={"description": "Heart Rate Measurement"})
+    assert response.status_code == 200, response.text
+
+    second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+    assert "Heart Rate Measurement" in second.text
+    assert client.get(path, headers={"If-None-Match": second.headers["ETag"]}).status_code == 304
+
+
+def patch_single(client, changes: dict):
+    return client.patch("/attributes/2A37", json=changes)
+
+
+def patch_batch(client, changes: dict):
+    return client.patch("/attributes/", json={"uuids": ["2A37"], "changes": changes})
+
+
+@pytest.mark.parametrize("patch", [patch_single, patch_batch])
+def test_patch_checks_service_uuid(client, patch):
+    create(client, attribute("180D"), attribute("2A37", "characteristic", "180D"))
+    assert patch(client, {"service_uuid": "not a uuid"}).status_code == 422
+    response = patch(client, {"service_uuid": "180F"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Referenced service not found"
+    # Detaching a characteristic from its service leaves it without a parent
+    assert patch(client, {"service_uuid": None}).status_code == 400
+    assert client.get("/attributes/2A37").json()["service_uuid"] == "180D"
+
+
+CAPTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "captures")
+
+
+def upload_log(client, content: bytes, **form):
+    response = client.post(
+        "/upload-log/",
+        files={"file": ("heart_rate.txt", content, "text/plain")},
+        data={"vendor": "Acme", "model": "Band", "dialect": "lightblue", **form},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_reuploading_a_log_is_reported_as_a_duplicate(client):
+    with open(os.path.join(CAPTURES, "lightblue_heart_rate.txt"), "rb") as log_file:
+        content = log_file.read()
+    first = upload_log(client, content)
+    assert first["duplicate"] is False
+    assert first["created"] > 0
+
+    again = upload_log(client, content)
+    assert again["duplicate"] is True
+    assert again["digest"] == first["digest"]
+    assert again["created"] == again["updated"] == again["lines_parsed"] == 0
+
+    # Any changed byte is a different log, imported again
+    changed = upload_log(client, content.replace(b"0x064A", b"0x064B"))
+    assert changed["duplicate"] is False
+    assert changed["digest"] != first["digest"]
+    assert changed["lines_parsed"] > 0
+    assert client.get("/attributes/2A37").json()["sample_data"] == "0x064B"
+
+    # So are the same bytes imported with other parameters, or with force
+    assert upload_log(client, content, model="Band 2")["duplicate"] is False
+    assert upload_log(client, content, force="true")["duplicate"] is False
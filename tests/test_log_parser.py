@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from log_parser import LogParser, parse_log_file
+
+CAPTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "captures")
+
+
+def parse_capture(name: str, dialect: str) -> dict:
+    _, records = parse_log_file(os.path.join(CAPTURES, name), "Vendor", "Model", None, dialect)
+    return {record["uuid"]: record for record in records}
+
+
+def services(records: dict) -> set[str]:
+    return {uuid for uuid, record in records.items() if record["attribute_type"] == "service"}
+
+
+def flags(record: dict) -> set[str]:
+    return {name for name in ("can_read", "can_write", "can_notify", "can_indicate") if record[name]}
+
+
+def test_btmon_services_come_from_group_type_responses_only():
+    records = parse_capture("btmon_heart_rate.txt", "btmon")
+    # Find Information Responses list descriptors (2902, 2908) with the same "UUID:" lines
+    assert services(records) == {"1800", "1801", "180D", "180F", "6217FF4B-FB31-1140-AD5A-A45545D7ECF3"}
+    assert "2902" not in records and "2908" not in records
+
+
+def test_btmon_characteristics_belong_to_the_service_holding_their_handle():
+    records = parse_capture("btmon_heart_rate.txt", "btmon")
+    # All services are listed before any characteristic is discovered
+    assert records["2A00"]["service_uuid"] == "1800"
+    assert records["2A37"]["service_uuid"] == "180D"
+    assert records["2A38"]["service_uuid"] == "180D"
+    assert records["2A19"]["service_uuid"] == "180F"
+    assert records["6217FF4D-FB31-1140-AD5A-A45545D7ECF3"]["service_uuid"] == "6217FF4B-FB31-1140-AD5A-A45545D7ECF3"
+
+
+def test_btmon_properties():
+    records = parse_capture("btmon_heart_rate.txt", "btmon")
+    assert flags(records["2A37"]) == {"can_notify"}
+    assert flags(records["2A19"]) == {"can_read", "can_notify"}
+    assert flags(records["6217FF4C-FB31-1140-AD5A-A45545D7ECF3"]) == {"can_write", "can_indicate"}
+    assert records["2A37"]["description"] == "Heart Rate Measurement"
+
+
+def test_lightblue_capture():
+    records = parse_capture("lightblue_heart_rate.txt", "lightblue")
+    named = {record["description"]: record for record in records.values()}
+    assert {"180D", "180F"} <= services(records)
+    assert named["Device Information"]["attribute_type"] == "service"
+    assert records["2A37"]["service_uuid"] == "180D"
+    assert records["2A19"]["service_uuid"] == "180F"
+    assert named["Firmware Revision"]["service_uuid"] == named["Device Information"]["uuid"]
+    assert flags(records["2A37"]) == {"can_read", "can_notify"}
+    assert records["2A37"]["sample_data"] == "0x064A"
+    assert flags(records["2A38"]) == {"can_read", "can_write"}
+
+
+def test_lightblue_placeholder_uuids_are_deterministic():
+    first = parse_capture("lightblue_heart_rate.txt", "lightblue")
+    second = parse_capture("lightblue_heart_rate.txt", "lightblue")
+    assert first.keys() == second.keys()
+
+
+def test_lightblue_bulk_updates_match_line_by_line():
+    with open(os.path.join(CAPTURES, "lightblue_heart_rate.txt")) as log_file:
+        lines = log_file.read().splitlines()
+    # The same characteristic spelled two ways keeps the last value either way
+    lines += ["12:00:00.000 Updated Value of Characteristic 2a37 to 0x0A", "12:00:00.001 Updated Value of Characteristic 2A37 to 0x0B"]
+    single, bulk = LogParser(dialect="lightblue"), LogParser(dialect="lightblue")
+    for line in lines:
+        single.feed(line)
+    bulk.feed_lines(lines)
+    assert bulk.records() == single.records()
+    assert bulk.lines == single.lines
+
+def test_nrf_connect_capture():
+    records = parse_capture("nrf_connect_thingy.txt", "nrf_connect")
+    assert services(records) == {"1800", "1801", "180F", "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"}
+    # Indented descriptor lines are neither services nor characteristics
+    assert "2902" not in records
+    tx = records["6E400003-B5A3-F393-E0A9-E50E24DCCA9E"]
+    assert tx["service_uuid"] == "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"
+    assert flags(tx) == {"can_notify"}
+    assert tx["sample_data"] == "0x48656C6C6F"
+    assert records["6E400002-B5A3-F393-E0A9-E50E24DCCA9E"]["sample_data"] == "0x0102"
+    assert flags(records["2A19"]) == {"can_read", "can_notify"}
+    assert records["2A19"]["sample_data"] == "0x5A"
+
+
+@pytest.mark.parametrize("dialect", ["btmon", "lightblue", "nrf_connect"])
+def test_noise_is_ignored(dialect):
+    parser = LogParser(dialect=dialect)
+    for line in ["", "random text", "Connected to 00:11:22:33:44:55", "> HCI Event: Disconnect Complete (0x05) plen 4"]:
+        parser.feed(line)
+    assert parser.records() == []
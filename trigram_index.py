@@ -0,0 +1,217 @@
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+# In-process trigram index for fuzzy attribute lookup.
+#
+# Two kinds of n-grams are indexed per attribute, in separate namespaces:
+# hex 4-grams of the UUID with the separators removed ("#" prefix), so pasted
+# UUIDs match with or without dashes, plus its first one to three hex digits
+# ("#^" prefix) for fragments too short to have a 4-gram, and padded word
+# trigrams of the description, vendor and model (pg_trgm style: "  w", " wo",
+# "wor", ...).
+# UUIDs use 4-grams because there are only 4096 hex trigrams, each of them in
+# a large share of the rows. A query is scored against both and the better one
+# counts. The score is the fraction of the query's n-grams found in the
+# attribute, so a partial UUID or one with a transposed nibble still ranks high.
+#
+# The index keeps no UUID keys: exact UUID lookups go to the database (the
+# caller passes the row id as `exact`). `version` is the database version the
+# index reflects; the caller applies the rows written since then.
+#
+# Postings are append-only arrays of row ids. Updates only append the
+# trigrams a row gained; removed or changed rows leave stale postings behind,
+# which are skipped because every candidate is re-scored from its current
+# text, and dropped by compact() once they make up half the postings.
+#
+# Search only reads the postings of the query's PROBE rarest n-grams (fewer if
+# min_score allows: a row scoring at least min_score contains one of the
+# n - ceil(min_score * n) + 1 rarest), and stops adding postings once
+# PROBE_BUDGET row ids have been read. Every row scoring above 1 - PROBE / n
+# is a candidate unless the budget runs out; the rows hit most often are
+# re-scored exactly.
+PROBE = 4
+PROBE_BUDGET = 8000
+HEX_SEPARATORS = re.compile(r"[\s:_-]+")
+HEX_ONLY = re.compile(r"[0-9a-f]+")
+WORD = re.compile(r"\w+")
+
+
+def hex_value(text: str) -> str | None:
+    value = HEX_SEPARATORS.sub("", text.lower())
+    return value if HEX_ONLY.fullmatch(value) else None
+
+
+def hex_grams(uuid: str) -> set[str]:
+    value = hex_value(uuid)
+    if value is None:
+        return set()
+    return {"#" + value[i:i + 4] for i in range(len(value) - 3)}
+
+
+def prefix_grams(uuid: str) -> set[str]:
+    value = hex_value(uuid)
+    if value is None:
+        return set()
+    return {"#^" + value[:i] for i in range(1, min(len(value), 3) + 1)}
+
+
+def uuid_grams(uuid: str) -> set[str]:
+    return hex_grams(uuid) | prefix_grams(uuid)
+
+
+# Descriptions, vendors and models repeat a lot, so their trigrams are cached
+@lru_cache(maxsize=65536)
+def text_trigrams(text: str) -> frozenset[str]:
+    trigrams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+
+def word_trigrams(*texts) -> set[str]:
+    trigrams = set()
+    for text in texts:
+        if text:
+            trigrams |= text_trigrams(text)
+    return trigrams
+
+
+# (fraction of the query found, Jaccard similarity as the tie-break)
+def similarity(query: set[str], grams: set[str]) -> tuple[float, float]:
+    if not query:
+        return 0.0, 0.0
+    common = len(query & grams)
+    return common / len(query), common / (len(query) + len(grams) - common)
+
+
+class TrigramIndex:
+    def __init__(self):
+        # row id -> (uuid, description, vendor, model)
+        self.docs: dict[int, tuple] = {}
+        self.version = 0
+        self.postings: dict[str, array] = {}
+        self.postings_count = 0
+        self.stale = 0
+        # Shared copies of repeated vendor/model strings
+        self._strings: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @staticmethod
+    def trigrams(doc: tuple) -> set[str]:
+        return uuid_grams(doc[0] or "") | word_trigrams(doc[1], doc[2], doc[3])
+
+    def add(self, doc_id: int, uuid: str, description, vendor, model):
+        intern = self._strings.setdefault
+        doc = (uuid, description, intern(vendor, vendor) if vendor else vendor,
+               intern(model, model) if model else model)
+        old = self.docs.get(doc_id)
+        if old == doc:
+            return
+        old_trigrams = self.trigrams(old) if old is not None else set()
+        new_trigrams = self.trigrams(doc)
+        for trigram in new_trigrams - old_trigrams:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                posting = self.postings[trigram] = array("I")
+            posting.append(doc_id)
+        self.postings_count += len(new_trigrams - old_trigrams)
+        self.stale += len(old_trigrams - new_trigrams)
+        self.docs[doc_id] = doc
+        self._maybe_compact()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(*row)
+
+    def remove(self, doc_id: int):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.stale += len(self.trigrams(doc))
+        self._maybe_compact()
+
+    def compact(self):
+        self.postings = {}
+        self.postings_count = 0
+        self.stale = 0
+        for doc_id, doc in self.docs.items():
+            for trigram in self.trigrams(doc):
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    posting = self.postings[trigram] = array("I")
+                posting.append(doc_id)
+                self.postings_count += 1
+
+    def _maybe_compact(self):
+        if self.stale > 1024 and self.stale * 2 > self.postings_count:
+            self.compact()
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.3,
+               exact: int | None = None) -> list[tuple[float, int]]:
+        """Return up to `limit` (score, row id) pairs, best first.
+
+        `exact` is the id of the row whose UUID is the query, if any; it
+        always scores 1.
+        """
+        hex_query = hex_grams(query)
+        doc_hex_grams = hex_grams
+        value = hex_value(query)
+        # Too short for a 4-gram: match it as a UUID prefix
+        if value and not hex_query:
+            hex_query = {"#^" + value}
+            doc_hex_grams = prefix_grams
+        # A hex string with digits in it is a UUID fragment, not words
+        word_query = set() if hex_query and any(c.isdigit() for c in query) else word_trigrams(query)
+        wanted = max(limit * 2, 20)
+        candidates = []
+        for grams in (hex_query, word_query):
+            # n-grams no row has (e.g. from a typo) cannot produce candidates
+            present = sorted((len(self.postings[gram]), gram) for gram in grams if gram in self.postings)
+            probe = min(len(grams) - math.ceil(min_score * len(grams)) + 1, PROBE)
+            postings = []
+            scanned = 0
+            for size, gram in present[:probe]:
+                if postings and scanned + size > PROBE_BUDGET:
+                    break
+                postings.append(self.postings[gram])
+                scanned += size
+            if len(postings) == 1:
+                candidates.extend(postings[0][:wanted])
+            elif postings:
+                # Rows in every probed posting are the ones hit most often
+                common = set(postings[0]).intersection(*postings[1:])
+                if len(common) >= wanted:
+                    candidates.extend(islice(common, wanted))
+                    continue
+                hits = Counter()
+                for posting in postings:
+                    hits.update(posting)
+                candidates.extend(doc_id for doc_id, _ in hits.most_common(wanted))
+        if exact is not None:
+            candidates.append(exact)
+
+        # Re-score the candidates from their current text
+        results = {}
+        for doc_id in candidates:
+            doc = self.docs.get(doc_id)
+            if doc is None:
+                continue
+            score = (0.0, 0.0)
+            if hex_query:
+                score = similarity(hex_query, doc_hex_grams(doc[0] or ""))
+            if word_query:
+                score = max(score, similarity(word_query, word_trigrams(doc[1], doc[2], doc[3])))
+            if doc_id == exact:
+                score = (1.0, 1.0)
+            if score[0] >= min_score:
+                results[doc_id] = score
+        best = heapq.nlargest(limit, results.items(), key=lambda item: (item[1], -item[0]))
+        return [(score[0], doc_id) for doc_id, score in best]